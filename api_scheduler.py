@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API Scheduler
+
+Shared building blocks for sending many chat-completions requests from one
+process without exceeding the account limits, used by the batch mode of
+clean_json_with_ai.py:
+
+- RateLimiter: token buckets for requests per minute and tokens per minute,
+  plus a global pause that every worker honours after a 429
+- SpendTracker: estimates the cost of each request up front and refuses new
+  requests once the spend cap would be exceeded
+- FairQueue: a priority queue of tasks (e.g. smallest file first) that knows
+  when all submitted work is finished
+"""
+
+import time
+import heapq
+import itertools
+import threading
+
+# gpt-4o-mini list prices in USD per 1M tokens
+DEFAULT_PRICE_INPUT = 0.15
+DEFAULT_PRICE_OUTPUT = 0.60
+
+
+def estimate_tokens(text):
+    """Rough token count for mixed Chinese/ASCII text (about one token per CJK character)"""
+    if not text:
+        return 0
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (len(text) - ascii_chars) + ascii_chars // 4 + 1
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits shared by all workers"""
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.request_allowance = float(requests_per_minute or 0)
+        self.token_allowance = float(tokens_per_minute or 0)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def refill(self, now):
+        elapsed = now - self.updated
+        self.updated = now
+        if self.requests_per_minute:
+            self.request_allowance = min(float(self.requests_per_minute),
+                                         self.request_allowance + elapsed * self.requests_per_minute / 60.0)
+        if self.tokens_per_minute:
+            self.token_allowance = min(float(self.tokens_per_minute),
+                                       self.token_allowance + elapsed * self.tokens_per_minute / 60.0)
+
+    def acquire(self, tokens):
+        """Block until one request with about `tokens` tokens may be sent"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.refill(now)
+                wait = self.paused_until - now
+                if self.requests_per_minute and self.request_allowance < 1:
+                    wait = max(wait, (1 - self.request_allowance) * 60.0 / self.requests_per_minute)
+                if self.tokens_per_minute:
+                    # A single request larger than the whole budget only waits for a full bucket
+                    needed = min(tokens, self.tokens_per_minute)
+                    if self.token_allowance < needed:
+                        wait = max(wait, (needed - self.token_allowance) * 60.0 / self.tokens_per_minute)
+                if wait <= 0:
+                    if self.requests_per_minute:
+                        self.request_allowance -= 1
+                    if self.tokens_per_minute:
+                        self.token_allowance -= tokens
+                    return
+            time.sleep(min(wait, 5.0))
+
+    def adjust(self, tokens):
+        """Charge (or refund, if negative) the difference between actual and estimated tokens"""
+        if self.tokens_per_minute:
+            with self.lock:
+                self.token_allowance -= tokens
+
+    def pause(self, seconds):
+        """Hold back every worker for `seconds`, e.g. after the API answered 429"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class SpendTracker:
+    """Tracks API spend and enforces an optional cap (in USD)"""
+
+    def __init__(self, max_spend=None, price_input=DEFAULT_PRICE_INPUT, price_output=DEFAULT_PRICE_OUTPUT):
+        self.max_spend = max_spend
+        self.price_input = price_input
+        self.price_output = price_output
+        self.spent = 0.0
+        self.reserved = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.lock = threading.Lock()
+
+    def cost(self, prompt_tokens, completion_tokens):
+        return (prompt_tokens * self.price_input + completion_tokens * self.price_output) / 1_000_000
+
+    def reserve(self, prompt_tokens, completion_tokens):
+        """Reserve the estimated cost of a request; returns the reservation, or None if over the cap"""
+        estimate = self.cost(prompt_tokens, completion_tokens)
+        with self.lock:
+            if self.max_spend is not None and self.spent + self.reserved + estimate > self.max_spend:
+                return None
+            self.reserved += estimate
+        return estimate
+
+    def settle(self, reservation, prompt_tokens, completion_tokens):
+        """Replace a reservation with the actual cost of the request (0 tokens if it failed)"""
+        with self.lock:
+            self.reserved -= reservation
+            self.spent += self.cost(prompt_tokens, completion_tokens)
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+
+class FairQueue:
+    """Priority queue of tasks that tracks outstanding work
+
+    Lower priority values are served first; tasks with equal priority are
+    served in submission order. get() returns None once every submitted task
+    has been marked done and nothing is left to hand out.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.counter = itertools.count()
+        self.outstanding = 0
+        self.condition = threading.Condition()
+
+    def put(self, priority, task):
+        with self.condition:
+            heapq.heappush(self.heap, (priority, next(self.counter), task))
+            self.outstanding += 1
+            self.condition.notify()
+
+    def get(self):
+        with self.condition:
+            while not self.heap:
+                if self.outstanding == 0:
+                    return None
+                self.condition.wait()
+            return heapq.heappop(self.heap)[2]
+
+    def task_done(self):
+        with self.condition:
+            self.outstanding -= 1
+            if self.outstanding == 0:
+                self.condition.notify_all()
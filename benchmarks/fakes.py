@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Offline Stand-ins for OCR and the Chat Completions API
+
+- StubPix2Text replaces the Pix2Text model in read_pdf_with_ocr.py. It sleeps
+  for a fixed time plus a time per megapixel, so image preprocessing changes
+  still show up in the benchmarks without loading any model.
+- FakeChatServer is a local HTTP server that answers OpenAI-style
+  /v1/chat/completions requests with configurable latency and error rate.
+  It echoes the quoted text from the prompt back as the "cleaned" text.
+
+Usage:
+    python benchmarks/fakes.py chat-server [--port 8001] [--latency 0.2] [--error-rate 0.05]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+
+class StubPix2Text:
+    """Drop-in for pix2text.Pix2Text().recognize with a deterministic cost model"""
+
+    def __init__(self, latency=0.02, seconds_per_megapixel=0.05):
+        self.latency = latency
+        self.seconds_per_megapixel = seconds_per_megapixel
+        self.calls = 0
+        self.pixels = 0
+
+    def image_pixels(self, image):
+        try:
+            from PIL import Image
+        except ImportError:
+            return 0
+        if isinstance(image, (str, os.PathLike)):
+            with Image.open(image) as img:
+                return img.width * img.height
+        return image.width * image.height
+
+    def recognize(self, image, out_type='text', **kwargs):
+        pixels = self.image_pixels(image)
+        self.calls += 1
+        self.pixels += pixels
+        time.sleep(self.latency + self.seconds_per_megapixel * pixels / 1_000_000)
+        if out_type == 'latex':
+            return {"raw_output": r"\frac{120-30}{3}=30"}
+        return {"raw_output": "(120 - 30) ÷ 3 = 30"}
+
+
+def install_stub_ocr(latency=0.02, seconds_per_megapixel=0.05):
+    """Make read_pdf_with_ocr.py use StubPix2Text instead of loading Pix2Text"""
+    import read_pdf_with_ocr
+
+    stub = StubPix2Text(latency, seconds_per_megapixel)
+    read_pdf_with_ocr._pix2text_model = stub
+    return stub
+
+
+class FakeChatHandler(BaseHTTPRequestHandler):
+    """Answers chat-completions requests using the settings of its server"""
+
+    def do_POST(self):
+        settings = self.server.settings
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length).decode("utf-8") or "{}")
+
+        with self.server.lock:
+            self.server.requests += 1
+        delay = settings["latency"] + random.uniform(0, settings["jitter"])
+        time.sleep(delay)
+
+        if random.random() < settings["error_rate"]:
+            with self.server.lock:
+                self.server.errors += 1
+            status = random.choice([429, 500])
+            self.send_json(status, {"error": {"message": "Simulated failure", "code": status}},
+                           {"Retry-After": "1"} if status == 429 else None)
+            return
+
+        prompt = payload.get("messages", [{}])[-1].get("content", "")
+        quoted = re.findall(r'"(.*?)"', prompt, re.DOTALL)
+        content = quoted[-1] if quoted else prompt.strip()
+        prompt_tokens = sum(len(message.get("content", "")) for message in payload.get("messages", []))
+        self.send_json(200, {
+            "id": f"chatcmpl-fake-{self.server.requests}",
+            "object": "chat.completion",
+            "model": payload.get("model", "fake"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(content),
+                      "total_tokens": prompt_tokens + len(content)},
+        })
+
+    def send_json(self, status, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeChatServer:
+    """Local chat-completions server, usable as a context manager"""
+
+    def __init__(self, latency=0.1, jitter=0.0, error_rate=0.0, host="127.0.0.1", port=0):
+        self.server = ThreadingHTTPServer((host, port), FakeChatHandler)
+        self.server.daemon_threads = True
+        self.server.settings = {"latency": latency, "jitter": jitter, "error_rate": error_rate}
+        self.server.lock = threading.Lock()
+        self.server.requests = 0
+        self.server.errors = 0
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    @property
+    def requests(self):
+        return self.server.requests
+
+    @property
+    def errors(self):
+        return self.server.errors
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run offline stand-ins for the external services')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    chat = subparsers.add_parser('chat-server', help='Serve fake chat completions')
+    chat.add_argument('--port', type=int, default=8001, help='Port to listen on')
+    chat.add_argument('--latency', type=float, default=0.2, help='Seconds per request')
+    chat.add_argument('--jitter', type=float, default=0.0, help='Extra random delay per request, in seconds')
+    chat.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 429/500')
+    args = parser.parse_args()
+
+    server = FakeChatServer(args.latency, args.jitter, args.error_rate, port=args.port)
+    print(f"Fake chat completions at {server.url}")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server.server_close()
+        print(f"Served {server.requests} requests ({server.errors} simulated errors)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Import-Time Benchmark
+
+Checks that importing the pipeline scripts (and running read_pdf_with_ocr.py
+--help) stays fast, i.e. that the OCR stack (pix2text, torch, ...) and the
+image libraries are only loaded when an image actually needs OCR.
+
+Each measurement runs in a fresh Python process. The script exits with a
+non-zero status if a heavy module is imported eagerly or if a measurement
+exceeds its time budget, so it can be used as a regression check.
+
+Usage:
+    python benchmarks/import_time.py [--runs 5] [--budget 0.5] [--json results.json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must not be loaded by a plain import of the pipeline scripts
+HEAVY_MODULES = ["pix2text", "torch", "torchvision", "transformers", "onnxruntime",
+                 "cv2", "numpy", "PIL"]
+
+# Scripts whose import time is measured
+MODULES = ["read_pdf_with_ocr", "docx_to_text", "simple_parser"]
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{"seconds": elapsed, "heavy_modules": heavy}}))
+"""
+
+
+def measure_import(module, runs):
+    """Import a module in fresh interpreters and return the median time and any heavy modules"""
+    timings = []
+    heavy = set()
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=REPO_DIR,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+        if result.returncode != 0:
+            return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed"}
+        data = json.loads(result.stdout.strip().splitlines()[-1])
+        timings.append(data["seconds"])
+        heavy.update(data["heavy_modules"])
+    return {"seconds": statistics.median(timings), "heavy_modules": sorted(heavy)}
+
+
+def measure_command(args, runs):
+    """Run a command in fresh interpreters and return its median wall time"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable] + args,
+            cwd=REPO_DIR,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+        timings.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "command failed"}
+    return {"seconds": statistics.median(timings), "heavy_modules": []}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure import time of the pipeline scripts')
+    parser.add_argument('--runs', type=int, default=5, help='Number of fresh interpreters per measurement')
+    parser.add_argument('--budget', type=float, default=0.5, help='Maximum allowed median time in seconds')
+    parser.add_argument('--json', default=None, help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    results = {}
+    for module in MODULES:
+        results[f"import {module}"] = measure_import(module, args.runs)
+    results["read_pdf_with_ocr.py --help"] = measure_command(["read_pdf_with_ocr.py", "--help"], args.runs)
+
+    failed = False
+    for name, result in results.items():
+        if "error" in result:
+            print(f"[SKIP] {name}: {result['error']}")
+            continue
+        status = "OK"
+        if result["heavy_modules"]:
+            status = "FAIL"
+            failed = True
+        elif result["seconds"] > args.budget:
+            status = "SLOW"
+            failed = True
+        heavy = f" (loaded {', '.join(result['heavy_modules'])})" if result["heavy_modules"] else ""
+        print(f"[{status}] {name}: {result['seconds'] * 1000:.1f} ms{heavy}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"budget_seconds": args.budget, "results": results}, f, indent=2)
+        print(f"Results saved to: {args.json}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
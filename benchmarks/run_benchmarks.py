@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pipeline Benchmarks
+
+Per-stage and end-to-end benchmarks on a synthetic corpus, fully offline:
+OCR uses StubPix2Text and AI cleaning talks to a local FakeChatServer
+(see fakes.py). Each benchmark runs in a fresh Python process, so the
+reported peak RSS belongs to that benchmark alone.
+
+Benchmarks:
+    parse         simple_parser.parse_problems on marker-format texts
+    docx_extract  docx_to_text.read_docx on DOCX files (no OCR)
+    pdf_extract   Text layer and image extraction from PDFs (PyMuPDF)
+    pdf_ocr       read_pdf_with_ocr with the stub OCR model (PyMuPDF, Pillow, NumPy)
+    clean         clean_json_with_ai.clean_json_file against the fake API (requests)
+    end_to_end    Staged pipeline over PDFs: extract, stub OCR, parse, clean
+
+Results are written as JSON and compared against a stored baseline;
+throughput, p95 latency and peak RSS that get worse by more than
+--tolerance are reported as regressions (exit status 1), and so is a
+benchmark that fails. Benchmarks whose dependencies are not installed are
+reported as skipped.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--size small] [--only parse,clean]
+    python benchmarks/run_benchmarks.py --save-baseline
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import contextlib
+import subprocess
+from datetime import datetime
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+for path in (REPO_DIR, BENCHMARK_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCHMARK_DIR, "results", "latest.json")
+SKIPPED_EXIT_CODE = 3
+
+# Corpus sizes: files per benchmark, problems per file, formula images per PDF
+SIZES = {
+    "small": {"files": 4, "problems": 4, "images": 3},
+    "medium": {"files": 12, "problems": 8, "images": 6},
+    "large": {"files": 40, "problems": 16, "images": 12},
+}
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    import resource
+
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+
+def timed_calls(func, inputs):
+    """Call func on every input with stdout silenced; return per-call latencies"""
+    latencies = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for value in inputs:
+            start = time.perf_counter()
+            func(value)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_parse(workdir, size, args):
+    from synthetic_corpus import write_text_corpus
+    from simple_parser import parse_problems
+
+    paths = write_text_corpus(workdir, size["files"], size["problems"])
+    return {"latencies": timed_calls(parse_problems, paths)}
+
+
+def bench_docx_extract(workdir, size, args):
+    from synthetic_corpus import write_docx_corpus
+    from docx_to_text import read_docx
+
+    paths = write_docx_corpus(workdir, size["files"], size["problems"])
+    return {"latencies": timed_calls(lambda path: read_docx(path, use_ocr=False), paths)}
+
+
+def bench_pdf_extract(workdir, size, args):
+    from synthetic_corpus import write_pdf_corpus
+    from read_pdf_with_ocr import extract_text_layer, extract_images_from_pdf
+
+    paths = write_pdf_corpus(workdir, size["files"], size["problems"], images=size["images"])
+
+    def extract(path):
+        image_dir = tempfile.mkdtemp(dir=workdir)
+        extract_text_layer(path)
+        extract_images_from_pdf(path, image_dir)
+        shutil.rmtree(image_dir)
+
+    return {"latencies": timed_calls(extract, paths)}
+
+
+def bench_pdf_ocr(workdir, size, args):
+    import numpy  # noqa: F401  (preprocessing needs NumPy; fail early so the benchmark is skipped)
+    from PIL import Image  # noqa: F401
+    from synthetic_corpus import write_pdf_corpus
+    from fakes import install_stub_ocr
+    from read_pdf_with_ocr import read_pdf_with_ocr
+
+    paths = write_pdf_corpus(workdir, size["files"], size["problems"], images=size["images"])
+    stub = install_stub_ocr(args.ocr_latency, args.ocr_seconds_per_megapixel)
+    latencies = timed_calls(read_pdf_with_ocr, paths)
+    return {"latencies": latencies, "ocr_calls": stub.calls, "ocr_megapixels": round(stub.pixels / 1e6, 3)}
+
+
+def bench_clean(workdir, size, args):
+    import requests  # noqa: F401
+    import clean_json_with_ai
+    from synthetic_corpus import write_text_corpus
+    from simple_parser import parse_problems
+    from fakes import FakeChatServer
+
+    text_paths = write_text_corpus(workdir, size["files"], size["problems"], consolidations=1)
+    timed_calls(parse_problems, text_paths)
+    json_paths = [os.path.splitext(path)[0] + ".json" for path in text_paths]
+
+    with FakeChatServer(args.api_latency, error_rate=args.api_error_rate) as server:
+        clean_json_with_ai.ENDPOINT = server.url
+        clean_json_with_ai.API_KEY = "benchmark"
+        latencies = timed_calls(clean_json_with_ai.clean_json_file, json_paths)
+        return {"latencies": latencies, "api_requests": server.requests, "api_errors": server.errors}
+
+
+def bench_end_to_end(workdir, size, args):
+    import numpy  # noqa: F401
+    import requests  # noqa: F401
+    from PIL import Image  # noqa: F401
+    import clean_json_with_ai
+    import run_pdf_to_json_pipeline
+    from synthetic_corpus import write_pdf_corpus
+    from fakes import FakeChatServer, install_stub_ocr
+
+    paths = write_pdf_corpus(workdir, size["files"], size["problems"], images=size["images"])
+    install_stub_ocr(args.ocr_latency, args.ocr_seconds_per_megapixel)
+    pipeline_args = argparse.Namespace(extract_workers=1, ocr_workers=1, parse_workers=1,
+                                       clean_workers=args.clean_workers, queue_size=4,
+                                       clean=True, stats_json=None)
+
+    with FakeChatServer(args.api_latency, error_rate=args.api_error_rate) as server:
+        clean_json_with_ai.ENDPOINT = server.url
+        clean_json_with_ai.API_KEY = "benchmark"
+        pipeline = run_pdf_to_json_pipeline.build_staged_pipeline(pipeline_args)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            submitted = {}
+            pipeline.start()
+            for path in paths:
+                submitted[path] = time.perf_counter()
+                pipeline.submit(path)
+            pipeline.finish()
+            latencies = []
+            failed = 0
+            problems = 0
+            for item in pipeline.completed():
+                latencies.append(time.perf_counter() - submitted[item.path])
+                failed += 1 if item.error else 0
+                if "json_file" in item.data:
+                    with open(item.data["json_file"], encoding="utf-8") as f:
+                        data = json.load(f)
+                    problems += len(data["problems"] if isinstance(data, dict) else data)
+        stats = pipeline.stats()
+
+    # Without these the parse and clean stages did no real work and the numbers are meaningless
+    if not problems:
+        raise RuntimeError("end_to_end parsed no problems from the synthetic PDFs")
+    if not server.requests:
+        raise RuntimeError("end_to_end made no API requests")
+
+    return {"latencies": latencies, "failed": failed, "wall_seconds": stats["wall_seconds"],
+            "stages": stats["stages"], "problems": problems, "api_requests": server.requests}
+
+
+BENCHMARKS = {
+    "parse": bench_parse,
+    "docx_extract": bench_docx_extract,
+    "pdf_extract": bench_pdf_extract,
+    "pdf_ocr": bench_pdf_ocr,
+    "clean": bench_clean,
+    "end_to_end": bench_end_to_end,
+}
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_worker(name, args):
+    """Run one benchmark in this process and print its result as JSON"""
+    size = SIZES[args.size]
+    workdir = tempfile.mkdtemp(prefix=f"bench_{name}_")
+    try:
+        start = time.perf_counter()
+        try:
+            result = BENCHMARKS[name](workdir, size, args)
+        except ImportError as e:
+            print(json.dumps({"skipped": f"missing dependency: {e.name or e}"}))
+            sys.exit(SKIPPED_EXIT_CODE)
+        elapsed = result.pop("wall_seconds", None) or (time.perf_counter() - start)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    latencies = result.pop("latencies")
+    busy_seconds = sum(latencies)
+    summary = {
+        "items": len(latencies),
+        # Stage benchmarks run items back to back; end_to_end overlaps them, so use its wall time
+        "seconds": round(elapsed if name == "end_to_end" else busy_seconds, 4),
+        "latency_p50": round(percentile(latencies, 0.5), 4),
+        "latency_p95": round(percentile(latencies, 0.95), 4),
+        "latency_max": round(max(latencies) if latencies else 0.0, 4),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    summary["throughput"] = round(summary["items"] / summary["seconds"], 3) if summary["seconds"] else 0.0
+    summary.update(result)
+    print(json.dumps(summary))
+
+
+def run_in_subprocess(name, args):
+    """Run one benchmark in a fresh interpreter and return its result"""
+    command = [sys.executable, os.path.abspath(__file__), "--worker", name, "--size", args.size,
+               "--ocr-latency", str(args.ocr_latency),
+               "--ocr-seconds-per-megapixel", str(args.ocr_seconds_per_megapixel),
+               "--api-latency", str(args.api_latency), "--api-error-rate", str(args.api_error_rate),
+               "--clean-workers", str(args.clean_workers)]
+    result = subprocess.run(command, cwd=REPO_DIR, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    lines = result.stdout.strip().splitlines()
+    if result.returncode not in (0, SKIPPED_EXIT_CODE) or not lines:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"exit code {result.returncode}"
+        return {"error": error}
+    return json.loads(lines[-1])
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of regressions of results against baseline"""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get("benchmarks", {}).get(name)
+        if not previous or "throughput" not in result or "throughput" not in previous:
+            continue
+        if previous["throughput"] and result["throughput"] < previous["throughput"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {result['throughput']:.2f}/s vs baseline {previous['throughput']:.2f}/s")
+        if previous["latency_p95"] and result["latency_p95"] > previous["latency_p95"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 latency {result['latency_p95']:.3f}s vs baseline {previous['latency_p95']:.3f}s")
+        if previous["peak_rss_mb"] and result["peak_rss_mb"] > previous["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{name}: peak RSS {result['peak_rss_mb']:.0f} MB vs baseline {previous['peak_rss_mb']:.0f} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run offline pipeline benchmarks on a synthetic corpus')
+    parser.add_argument('--size', choices=sorted(SIZES), default='small', help='Corpus size')
+    parser.add_argument('--only', default=None, help='Comma-separated benchmark names (default: all)')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='Where to write the results JSON')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline results to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative regression (0.2 = 20%%)')
+    parser.add_argument('--ocr-latency', type=float, default=0.02, help='Stub OCR seconds per image')
+    parser.add_argument('--ocr-seconds-per-megapixel', type=float, default=0.05,
+                        help='Stub OCR extra seconds per megapixel')
+    parser.add_argument('--api-latency', type=float, default=0.05, help='Fake API seconds per request')
+    parser.add_argument('--api-error-rate', type=float, default=0.0, help='Fake API fraction of failed requests')
+    parser.add_argument('--clean-workers', type=int, default=4, help='Cleaning workers in end_to_end')
+    parser.add_argument('--worker', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args)
+        return
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    results = {}
+    for name in names:
+        print(f"Running {name} ({args.size})...", flush=True)
+        result = run_in_subprocess(name, args)
+        results[name] = result
+        if "skipped" in result:
+            print(f"  skipped: {result['skipped']}")
+        elif "error" in result:
+            print(f"  error: {result['error']}")
+        else:
+            print(f"  {result['items']} items, {result['throughput']:.2f}/s, "
+                  f"p50 {result['latency_p50'] * 1000:.1f} ms, p95 {result['latency_p95'] * 1000:.1f} ms, "
+                  f"peak RSS {result['peak_rss_mb']:.0f} MB")
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "size": args.size,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {"ocr_latency": args.ocr_latency, "ocr_seconds_per_megapixel": args.ocr_seconds_per_megapixel,
+                     "api_latency": args.api_latency, "api_error_rate": args.api_error_rate},
+        "benchmarks": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Results saved to: {args.output}")
+
+    errors = [name for name, result in results.items() if "error" in result]
+    if errors:
+        print(f"Benchmark(s) failed: {', '.join(errors)}")
+        sys.exit(1)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Baseline saved to: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("No baseline found; run with --save-baseline to create one")
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("size") != args.size:
+        print(f"Baseline was recorded with --size {baseline.get('size')}, skipping comparison")
+        return
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("Regressions against baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"No regressions against baseline (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
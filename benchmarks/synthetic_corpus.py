@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synthetic Corpus Generator
+
+Builds offline test inputs for every pipeline stage:
+
+- Marker-format texts (【例】/【考点】/【解析】/...) as read_pdf_with_ocr.py writes them
+- PDFs with a text layer plus embedded formula images (needs PyMuPDF)
+- DOCX files with paragraphs and OMML equations (standard library only)
+
+Everything is generated from a seed, so the same settings always produce the
+same corpus.
+
+Usage:
+    python benchmarks/synthetic_corpus.py OUTPUT_DIR [--files 10] [--problems 8] [--images 6] [--kind all]
+"""
+
+import os
+import random
+import zipfile
+import argparse
+from xml.sax.saxutils import escape
+
+SUBJECTS = ["归一问题", "归总问题", "还原问题", "和差问题", "和倍问题", "差倍问题", "年龄问题", "植树问题"]
+ITEMS = ["苹果", "铅笔", "练习本", "小树", "零件", "图书", "糖果", "气球"]
+PEOPLE = ["小明", "小红", "小刚", "小丽", "王老师", "李师傅"]
+DIFFICULTIES = ["1星", "2星", "3星", "4星"]
+PROBLEM_TYPES = ["解答题", "填空题", "选择题"]
+
+# Formulas used for the embedded images and OMML equations: (text, numerator, denominator)
+FORMULAS = [
+    ("(120 - 30) ÷ 3 = 30", "120-30", "3"),
+    ("48 × 5 ÷ 6 = 40", "48×5", "6"),
+    ("(84 + 12) ÷ 2 = 48", "84+12", "2"),
+    ("360 ÷ (15 - 9) = 60", "360", "15-9"),
+    ("25 × 4 + 75 = 175", "25×4+75", "1"),
+]
+
+
+def problem_fields(rng, number):
+    """Random but plausible field values for one problem"""
+    person = rng.choice(PEOPLE)
+    item = rng.choice(ITEMS)
+    count = rng.randint(3, 12)
+    total = count * rng.randint(4, 30)
+    formula = rng.choice(FORMULAS)[0]
+    return {
+        "题目": f"{person}买了{count}盒{item}，一共{total}个。照这样计算，买{count + number}盒{item}一共有多少个？",
+        "考点": rng.choice(SUBJECTS),
+        "难度": rng.choice(DIFFICULTIES),
+        "题型": rng.choice(PROBLEM_TYPES),
+        "关键词": f"{item}，{rng.choice(SUBJECTS)}",
+        "解析": f"先求一盒有{total}÷{count}={total // count}个，再求{count + number}盒：{formula}。" * rng.randint(1, 3),
+        "答案": f"{total // count * (count + number)}个",
+    }
+
+
+def format_fields(fields):
+    return (f"【考点】{fields['考点']}\n【难度】{fields['难度']}\n【题型】{fields['题型']}\n"
+            f"【关键词】{fields['关键词']}\n【解析】{fields['解析']}\n【答案】{fields['答案']}\n")
+
+
+def make_marker_text(problems=8, consolidations=2, seed=0, problems_per_page=2):
+    """
+    Build one document in the marker format that simple_parser.py reads
+
+    Args:
+        problems: Number of 【例】 problems
+        consolidations: Number of 【巩固】 problems after each example
+        seed: Random seed
+        problems_per_page: How many problems go between "--- Page N ---" headers
+
+    Returns:
+        str: The document text
+    """
+    rng = random.Random(seed)
+    parts = ["--- Page 1 ---\n知识框架\n本讲主要学习应用题的基本解法。\n模块一 基础题型\n"]
+    page = 1
+    for number in range(1, problems + 1):
+        if number > 1 and (number - 1) % problems_per_page == 0:
+            page += 1
+            parts.append(f"--- Page {page} ---\n")
+        fields = problem_fields(rng, number)
+        parts.append(f"【例 {number}】{fields['题目']}\n{format_fields(fields)}")
+        for _ in range(consolidations):
+            consol = problem_fields(rng, number)
+            parts.append(f"【巩固】{consol['题目']}\n{format_fields(consol)}")
+    return "\n".join(parts)
+
+
+def corpus_name(index, subject_index=None):
+    """File stem that matches the title pattern simple_parser.py expects"""
+    subject = SUBJECTS[(subject_index if subject_index is not None else index) % len(SUBJECTS)]
+    return f"6-1-{index + 1} 合成{subject}.教师版"
+
+
+def write_text_corpus(output_dir, files=10, problems=8, consolidations=2, seed=0):
+    """Write marker-format text files and return their paths"""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for index in range(files):
+        path = os.path.join(output_dir, f"{corpus_name(index)}_extracted_text_pdf.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(make_marker_text(problems, consolidations, seed + index))
+        paths.append(path)
+    return paths
+
+
+def render_formula_png(text, dpi=300):
+    """Render a formula as a PNG image with PyMuPDF (wide white margins, like scanned crops)"""
+    import fitz  # PyMuPDF
+
+    document = fitz.open()
+    page = document.new_page(width=320, height=80)
+    page.insert_text((40, 48), text, fontname="helv", fontsize=16)
+    pixmap = page.get_pixmap(dpi=dpi)
+    png = pixmap.tobytes("png")
+    document.close()
+    return png
+
+
+def layout_text_pages(document, lines, fontname="china-s", fontsize=9):
+    """
+    Add A4 pages holding the given lines in their text box and return how many were added
+
+    insert_textbox writes nothing and returns a negative value when the text
+    does not fit, so each page gets the longest run of lines that fits on a
+    scratch page, and the rest goes on the following pages.
+    """
+    import fitz  # PyMuPDF
+
+    text_box = fitz.Rect(40, 40, 555, 600)
+
+    def fits(chunk):
+        scratch = fitz.open()
+        try:
+            page = scratch.new_page(width=595, height=842)
+            return page.insert_textbox(text_box, "\n".join(chunk), fontname=fontname, fontsize=fontsize) >= 0
+        finally:
+            scratch.close()
+
+    page_count = 0
+    start = 0
+    while start < len(lines):
+        # Binary search for the longest run of lines that fits on one page
+        low, high = start, len(lines)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if fits(lines[start:middle]):
+                low = middle
+            else:
+                high = middle - 1
+        if low == start:
+            raise ValueError(f"Line does not fit on one page: {lines[start][:40]}")
+        page = document.new_page(width=595, height=842)
+        if page.insert_textbox(text_box, "\n".join(lines[start:low]), fontname=fontname, fontsize=fontsize) < 0:
+            raise ValueError("Text overflowed the page after layout")
+        page_count += 1
+        start = low
+    return page_count
+
+
+def write_pdf_corpus(output_dir, files=10, problems=8, consolidations=2, images=6, image_dpi=300, seed=0):
+    """
+    Write PDFs with a text layer and embedded formula images and return their paths
+
+    Each PDF gets `images` distinct formula images (rendered at image_dpi), so
+    the OCR stage has real pixels to work on.
+    """
+    import fitz  # PyMuPDF
+
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for index in range(files):
+        rng = random.Random(seed + index)
+        text = make_marker_text(problems, consolidations, seed + index)
+        document = fitz.open()
+        # The PDF is paginated by how much text fits, not by the marker text's page headers
+        lines = [line for line in text.splitlines() if not line.startswith("--- Page ")]
+        page_count = layout_text_pages(document, lines)
+        for page_index in range(page_count):
+            page = document[page_index]
+            # Spread the formula images over the pages, below the text box
+            for image_index in range(page_index, images, page_count):
+                formula = rng.choice(FORMULAS)[0]
+                png = render_formula_png(f"{formula}  [{index}-{image_index}]", dpi=image_dpi)
+                top = 610 + (image_index // page_count) * 45
+                page.insert_image(fitz.Rect(40, top, 360, top + 40), stream=png)
+        path = os.path.join(output_dir, f"{corpus_name(index)}.pdf")
+        document.save(path)
+        document.close()
+        paths.append(path)
+    return paths
+
+
+DOCX_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+</Types>"""
+
+DOCX_ROOT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+</Relationships>"""
+
+
+def omml_fraction(numerator, denominator):
+    return (f"<m:oMath><m:f><m:num><m:r><m:t>{escape(numerator)}</m:t></m:r></m:num>"
+            f"<m:den><m:r><m:t>{escape(denominator)}</m:t></m:r></m:den></m:f></m:oMath>")
+
+
+def make_docx_xml(problems=8, consolidations=2, seed=0):
+    """Build word/document.xml with one paragraph per line and an OMML fraction in every 解析"""
+    rng = random.Random(seed)
+    paragraphs = []
+    for line in make_marker_text(problems, consolidations, seed).splitlines():
+        if line.startswith("--- Page"):
+            continue
+        run = f"<w:r><w:t xml:space=\"preserve\">{escape(line)}</w:t></w:r>"
+        if line.startswith("【解析】"):
+            _, numerator, denominator = rng.choice(FORMULAS)
+            run += omml_fraction(numerator, denominator)
+        paragraphs.append(f"<w:p>{run}</w:p>")
+    return ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+            'xmlns:m="http://schemas.openxmlformats.org/officeDocument/2006/math"><w:body>'
+            + "".join(paragraphs) + "</w:body></w:document>")
+
+
+def write_docx_corpus(output_dir, files=10, problems=8, consolidations=2, seed=0):
+    """Write DOCX files and return their paths"""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for index in range(files):
+        path = os.path.join(output_dir, f"{corpus_name(index)}.docx")
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as docx:
+            docx.writestr("[Content_Types].xml", DOCX_CONTENT_TYPES)
+            docx.writestr("_rels/.rels", DOCX_ROOT_RELS)
+            docx.writestr("word/document.xml", make_docx_xml(problems, consolidations, seed + index))
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic question-bank corpus')
+    parser.add_argument('output', help='Output directory')
+    parser.add_argument('--files', type=int, default=10, help='Number of files per kind')
+    parser.add_argument('--problems', type=int, default=8, help='Example problems per file')
+    parser.add_argument('--consolidations', type=int, default=2, help='Consolidation problems per example')
+    parser.add_argument('--images', type=int, default=6, help='Formula images per PDF')
+    parser.add_argument('--image-dpi', type=int, default=300, help='Resolution of the formula images')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--kind', choices=['text', 'pdf', 'docx', 'all'], default='all', help='What to generate')
+    args = parser.parse_args()
+
+    if args.kind in ('text', 'all'):
+        paths = write_text_corpus(os.path.join(args.output, "text"), args.files, args.problems,
+                                  args.consolidations, args.seed)
+        print(f"Wrote {len(paths)} text files")
+    if args.kind in ('docx', 'all'):
+        paths = write_docx_corpus(os.path.join(args.output, "docx"), args.files, args.problems,
+                                  args.consolidations, args.seed)
+        print(f"Wrote {len(paths)} DOCX files")
+    if args.kind in ('pdf', 'all'):
+        try:
+            paths = write_pdf_corpus(os.path.join(args.output, "pdf"), args.files, args.problems,
+                                     args.consolidations, args.images, args.image_dpi, args.seed)
+            print(f"Wrote {len(paths)} PDF files")
+        except ImportError:
+            print("PyMuPDF is not installed, skipping PDF generation")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,27 +3,18 @@
 
 import os
 import json
+import glob
 import time
+import threading
 import requests
 import argparse
 
-def clean_text_with_ai(text, field_type, context=""):
-    """
-    Use GPT-4o-mini to clean and complete text that might have OCR errors
-    
-    Args:
-        text: The text to clean
-        field_type: The type of field (题目, 解析, 答案) to provide context
-        context: Additional context about the problem
-        
-    Returns:
-        Cleaned text from the AI
-    """
-    # API configuration - replace with your API key and endpoint
-    api_key = "Your API key"  # User will need to replace this
-    endpoint = "https://api.openai.com/v1/chat/completions"
-    
-    # Construct the prompt based on field type
+# API configuration - replace with your API key or pass --api-key
+API_KEY = os.environ.get("OPENAI_API_KEY", "Your API key")
+ENDPOINT = "https://api.openai.com/v1/chat/completions"
+
+def build_prompt(text, field_type, context=""):
+    """Construct the cleaning prompt based on field type"""
     if field_type == "题目":
         prompt = f"""
 你是一位专业的小学数学老师，擅长解读数学题目并修复OCR错误。
@@ -64,11 +55,13 @@ def clean_text_with_ai(text, field_type, context=""):
 "{text}"
 只输出修复后的文本，不需要任何解释或额外内容。
 """
-    
-    # API request setup
+    return prompt
+
+def build_request(prompt):
+    """Return the headers and payload of a chat-completions request for a prompt"""
     headers = {
         "Content-Type": "application/json",
-        "Authorization": f"Bearer {api_key}"
+        "Authorization": f"Bearer {API_KEY}"
     }
     
     payload = {
@@ -85,10 +78,26 @@ def clean_text_with_ai(text, field_type, context=""):
         ],
         "temperature": 0.2
     }
+    return headers, payload
+
+def clean_text_with_ai(text, field_type, context=""):
+    """
+    Use GPT-4o-mini to clean and complete text that might have OCR errors
+    
+    Args:
+        text: The text to clean
+        field_type: The type of field (题目, 解析, 答案) to provide context
+        context: Additional context about the problem
+        
+    Returns:
+        Cleaned text from the AI
+    """
+    prompt = build_prompt(text, field_type, context)
+    headers, payload = build_request(prompt)
     
     try:
         # Make the actual API call to clean the text
-        response = requests.post(endpoint, json=payload, headers=headers)
+        response = requests.post(ENDPOINT, json=payload, headers=headers)
         response_data = response.json()
         cleaned_text = response_data["choices"][0]["message"]["content"].strip()
         print(f"Cleaned '{field_type}' field: {text[:30]} -> {cleaned_text[:30]}...")
@@ -98,42 +107,52 @@ def clean_text_with_ai(text, field_type, context=""):
         print(f"Error in API call: {e}")
         return text  # Return original on error
 
-def clean_json_data():
-    """Clean JSON data with AI assistance"""
-    parser = argparse.ArgumentParser(description='Clean JSON data using GPT-4o-mini')
-    parser.add_argument('--input', default=None, help='Input JSON file path')
-    parser.add_argument('--output', default=None, help='Output JSON file path')
-    parser.add_argument('--api-key', default=None, help='OpenAI API key')
-    args = parser.parse_args()
+def cleaned_output_path(input_file):
+    """Default output path for a cleaned file: <input>_cleaned.json"""
+    return input_file.replace('.json', '_cleaned.json')
+
+def partial_output_path(input_file):
+    """Where batch mode keeps a file with fields still to clean: <input>_cleaned.partial.json"""
+    return input_file.replace('.json', '_cleaned.partial.json')
+
+def clean_problem(problem):
+    """Clean the 题目/解析/答案 fields of one problem in place"""
+    # Clean the title
+    problem['题目'] = clean_text_with_ai(problem['题目'], "题目")
     
-    # Input and output file paths
-    input_file = args.input or "/Users/lipeiyu/Downloads/小学奥数7大板块题库/应用题专题题库/教师解析版/归一问题.教师版_extracted_text.json"
-    output_file = args.output or input_file.replace('.json', '_cleaned.json')
+    # Clean the analysis with the context of the title
+    problem['解析'] = clean_text_with_ai(problem['解析'], "解析", problem['题目'])
     
-    # If API key provided as argument, use it
-    if args.api_key:
-        globals()["api_key"] = args.api_key
+    # Clean the answer with context of title and analysis
+    problem['答案'] = clean_text_with_ai(problem['答案'], "答案", problem['题目'])
+
+def clean_json_file(input_file, output_file=None):
+    """
+    Clean every problem in a parser output file and save the result
+    
+    Args:
+        input_file: JSON file written by simple_parser.py (a list of problems,
+                    or an object with a "problems" list)
+        output_file: Output path, defaults to <input>_cleaned.json
+        
+    Returns:
+        Path of the cleaned JSON file
+    """
+    output_file = output_file or cleaned_output_path(input_file)
     
     print(f"Loading JSON from {input_file}...")
     
     # Read input file
     with open(input_file, 'r', encoding='utf-8') as f:
         data = json.load(f)
+    problems = data['problems'] if isinstance(data, dict) else data
     
-    print(f"Found {len(data['problems'])} example problems to process.")
+    print(f"Found {len(problems)} example problems to process.")
     
     # Process each example problem
-    for i, problem in enumerate(data['problems']):
-        print(f"\nProcessing example problem {i+1}/{len(data['problems'])}: {problem['题目'][:30]}...")
-        
-        # Clean the title
-        problem['题目'] = clean_text_with_ai(problem['题目'], "题目")
-        
-        # Clean the analysis with the context of the title
-        problem['解析'] = clean_text_with_ai(problem['解析'], "解析", problem['题目'])
-        
-        # Clean the answer with context of title and analysis
-        problem['答案'] = clean_text_with_ai(problem['答案'], "答案", problem['题目'])
+    for i, problem in enumerate(problems):
+        print(f"\nProcessing example problem {i+1}/{len(problems)}: {problem['题目'][:30]}...")
+        clean_problem(problem)
         
         # Process consolidation problems
         consolidations = problem.get('巩固', [])
@@ -141,15 +160,7 @@ def clean_json_data():
         
         for j, consol in enumerate(consolidations):
             print(f"  Processing consolidation problem {j+1}/{len(consolidations)}: {consol['题目'][:30]}...")
-            
-            # Clean title
-            consol['题目'] = clean_text_with_ai(consol['题目'], "题目")
-            
-            # Clean analysis
-            consol['解析'] = clean_text_with_ai(consol['解析'], "解析", consol['题目'])
-            
-            # Clean answer
-            consol['答案'] = clean_text_with_ai(consol['答案'], "答案", consol['题目'])
+            clean_problem(consol)
             
             # Add small delay to avoid rate limits
             time.sleep(0.1)
@@ -162,10 +173,349 @@ def clean_json_data():
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
     
+    return output_file
+
+# Fields cleaned for every problem; 解析 and 答案 use the cleaned 题目 as context
+CLEANED_FIELDS = ("题目", "解析", "答案")
+
+class BatchFile:
+    """One parser output file in a batch run; saved as soon as its last field is done
+
+    Fields that could not be cleaned (API errors, spend cap) are remembered by
+    (problem index, field) and the file is saved to its .partial.json path, so
+    the next batch run re-queues only those fields.
+    """
+
+    def __init__(self, input_file, output_file, data, uncleaned=None):
+        self.input_file = input_file
+        self.output_file = output_file
+        self.partial_file = partial_output_path(input_file)
+        self.data = data
+        top_level = data['problems'] if isinstance(data, dict) else data
+        self.problems = []
+        for problem in top_level:
+            self.problems.append(problem)
+            self.problems.extend(problem.get('巩固', []))
+        if uncleaned is None:
+            uncleaned = [(index, field) for index in range(len(self.problems)) for field in CLEANED_FIELDS]
+        self.remaining = {}
+        for index, field in uncleaned:
+            self.remaining.setdefault(index, []).append(field)
+        self.pending = len(uncleaned)
+        self.cleaned = 0
+        self.unchanged = 0
+        self.failed = []
+        self.saved_file = None
+        self.lock = threading.Lock()
+
+    def tasks(self):
+        """(problem index, field, follow-up fields) to queue; 解析/答案 wait for an uncleaned 题目"""
+        for index, fields in sorted(self.remaining.items()):
+            fields = [field for field in CLEANED_FIELDS if field in fields]
+            if fields[0] == "题目":
+                yield index, "题目", tuple(fields[1:])
+            else:
+                for field in fields:
+                    yield index, field, ()
+
+    def field_done(self, index, field_type, cleaned, retry=False):
+        """Record a finished field; returns True when it was the file's last one
+
+        retry marks a field that failed and should be cleaned again on the next run.
+        """
+        with self.lock:
+            if cleaned:
+                self.cleaned += 1
+            else:
+                self.unchanged += 1
+            if retry:
+                self.failed.append((index, field_type))
+            self.pending -= 1
+            return self.pending == 0
+
+    def save(self):
+        if self.failed:
+            # Not the final output, so a later run resumes instead of skipping the file
+            with open(self.partial_file, 'w', encoding='utf-8') as f:
+                json.dump({"uncleaned": sorted(self.failed), "data": self.data}, f, ensure_ascii=False, indent=2)
+            self.saved_file = self.partial_file
+            print(f"Saved {self.partial_file} ({self.cleaned} fields cleaned, "
+                  f"{len(self.failed)} left for the next run)")
+            return
+        with open(self.output_file, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        self.saved_file = self.output_file
+        if os.path.exists(self.partial_file):
+            os.remove(self.partial_file)
+        note = f", {self.unchanged} left unchanged" if self.unchanged else ""
+        print(f"Saved {self.output_file} ({self.cleaned} fields cleaned{note})")
+
+def request_cleaned_field(session, limiter, spend, text, field_type, context, max_retries):
+    """
+    Send one cleaning request through the shared rate limiter and spend cap
+    
+    Returns:
+        (cleaned text or None, error message or None)
+    """
+    from api_scheduler import estimate_tokens
+
+    prompt = build_prompt(text, field_type, context)
+    headers, payload = build_request(prompt)
+    prompt_tokens = sum(estimate_tokens(message["content"]) for message in payload["messages"])
+    completion_tokens = estimate_tokens(text) + 16
+    reservation = spend.reserve(prompt_tokens, completion_tokens)
+    if reservation is None:
+        return None, "spend cap reached"
+
+    error = None
+    try:
+        for attempt in range(max_retries + 1):
+            limiter.acquire(prompt_tokens + completion_tokens)
+            backoff = min(2 ** attempt, 60)
+            try:
+                response = session.post(ENDPOINT, json=payload, headers=headers, timeout=120)
+            except requests.RequestException as e:
+                error = str(e)
+                time.sleep(backoff)
+                continue
+            
+            if response.status_code == 429 or response.status_code >= 500:
+                error = f"HTTP {response.status_code}"
+                try:
+                    retry_after = float(response.headers.get("Retry-After", backoff))
+                except ValueError:
+                    retry_after = backoff
+                if response.status_code == 429:
+                    # Hold back every worker, not just this one, to avoid a burst of 429s
+                    limiter.pause(retry_after)
+                else:
+                    time.sleep(retry_after)
+                continue
+            if response.status_code != 200:
+                return None, f"HTTP {response.status_code}: {response.text[:200]}"
+            
+            response_data = response.json()
+            cleaned_text = response_data["choices"][0]["message"]["content"].strip()
+            usage = response_data.get("usage") or {}
+            actual_prompt = usage.get("prompt_tokens", prompt_tokens)
+            actual_completion = usage.get("completion_tokens", estimate_tokens(cleaned_text))
+            spend.settle(reservation, actual_prompt, actual_completion)
+            reservation = None
+            limiter.adjust(actual_prompt + actual_completion - prompt_tokens - completion_tokens)
+            return cleaned_text, None
+        return None, f"gave up after {max_retries + 1} attempts ({error})"
+    except Exception as e:
+        return None, str(e)
+    finally:
+        if reservation is not None:
+            spend.settle(reservation, 0, 0)
+
+def record_error(errors, error):
+    with errors["lock"]:
+        errors[error] = errors.get(error, 0) + 1
+
+def batch_worker(queue, limiter, spend, max_retries, errors):
+    """Take field tasks from the shared queue until all files are finished"""
+    session = requests.Session()
+    while True:
+        task = queue.get()
+        if task is None:
+            return
+        try:
+            priority, batch_file, index, field_type, follow_ups = task
+            problem = batch_file.problems[index]
+            
+            cleaned_text = None
+            error = None
+            try:
+                text = problem.get(field_type) or ""
+                if text.strip():
+                    context = problem.get('题目', "") if field_type != "题目" else ""
+                    cleaned_text, error = request_cleaned_field(session, limiter, spend, text, field_type,
+                                                                context, max_retries)
+                    if cleaned_text is not None:
+                        problem[field_type] = cleaned_text
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            if error:
+                record_error(errors, error)
+            
+            # 解析 and 答案 are queued once the 题目 they use as context is cleaned
+            for follow_up in follow_ups:
+                queue.put(priority, (priority, batch_file, index, follow_up, ()))
+            if batch_file.field_done(index, field_type, cleaned_text is not None, retry=error is not None):
+                try:
+                    batch_file.save()
+                except Exception as e:
+                    record_error(errors, f"could not save {os.path.basename(batch_file.input_file)} "
+                                         f"({type(e).__name__}: {e})")
+        except Exception as e:
+            record_error(errors, f"{type(e).__name__}: {e}")
+        finally:
+            # Always, or the other workers would wait for this task forever
+            queue.task_done()
+
+def is_parser_output(data):
+    """True for the JSON that simple_parser.py writes: a list of problems or {"problems": [...]}"""
+    problems = data.get('problems') if isinstance(data, dict) else data
+    return isinstance(problems, list) and all(isinstance(problem, dict) for problem in problems)
+
+def find_batch_inputs(pattern):
+    """Parser output files in a directory, or matching a glob pattern (excluding cleaned outputs)"""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*.json")
+    return sorted(path for path in glob.glob(pattern)
+                  if not path.endswith(("_cleaned.json", "_cleaned.partial.json")))
+
+def clean_json_batch(input_files, workers=8, requests_per_minute=500, tokens_per_minute=200000,
+                     max_spend=None, order="smallest", max_retries=5, overwrite=False,
+                     price_input=None, price_output=None):
+    """
+    Clean many parser output files through one shared scheduler
+    
+    Every field of every file goes through the same worker pool, rate limiter
+    and spend cap. Files are served in priority order (smallest first by
+    default) and each file is saved as soon as its last field is cleaned.
+    Files with fields that could not be cleaned are saved as
+    <input>_cleaned.partial.json; the next run resumes them and only sends
+    the remaining fields.
+    
+    Args:
+        input_files: JSON files written by simple_parser.py
+        workers: Number of concurrent API requests
+        requests_per_minute: Request limit shared by all workers (None for no limit)
+        tokens_per_minute: Token limit shared by all workers (None for no limit)
+        max_spend: Stop sending requests once this many USD would be spent (None for no cap)
+        order: "smallest" to finish small files first, "input" to keep the given order
+        max_retries: Retries per request on 429/5xx/network errors
+        overwrite: Re-clean files whose _cleaned.json output already exists, and
+                   start partial files over from the input
+        price_input, price_output: USD per 1M prompt/completion tokens
+        
+    Returns:
+        dict with files, requests made, tokens and spend
+    """
+    from api_scheduler import (RateLimiter, SpendTracker, FairQueue,
+                               DEFAULT_PRICE_INPUT, DEFAULT_PRICE_OUTPUT)
+
+    if not overwrite:
+        skipped = [path for path in input_files if os.path.exists(cleaned_output_path(path))]
+        if skipped:
+            print(f"Skipping {len(skipped)} file(s) that already have a _cleaned.json output (use --overwrite)")
+        input_files = [path for path in input_files if path not in skipped]
+    if order == "smallest":
+        input_files = sorted(input_files, key=os.path.getsize)
+    
+    batch_files = []
+    for input_file in input_files:
+        # Other JSON in the folder (e.g. pipeline --stats-json output) is skipped, not fatal
+        try:
+            partial_file = partial_output_path(input_file)
+            if not overwrite and os.path.exists(partial_file):
+                with open(partial_file, 'r', encoding='utf-8') as f:
+                    partial = json.load(f)
+                data, uncleaned = partial['data'], partial['uncleaned']
+            else:
+                with open(input_file, 'r', encoding='utf-8') as f:
+                    data, uncleaned = json.load(f), None
+            if not is_parser_output(data):
+                print(f"Skipping {input_file}: not a parser output file")
+                continue
+            batch_file = BatchFile(input_file, cleaned_output_path(input_file), data, uncleaned)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Skipping {input_file}: could not load it ({type(e).__name__}: {e})")
+            continue
+        if uncleaned is not None:
+            print(f"Resuming {partial_file} ({len(uncleaned)} fields left)")
+        batch_files.append(batch_file)
+    
+    limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+    spend = SpendTracker(max_spend,
+                         DEFAULT_PRICE_INPUT if price_input is None else price_input,
+                         DEFAULT_PRICE_OUTPUT if price_output is None else price_output)
+    queue = FairQueue()
+    total_fields = sum(batch_file.pending for batch_file in batch_files)
+    print(f"Cleaning {total_fields} fields from {len(batch_files)} file(s) with {workers} workers")
+    
+    for rank, batch_file in enumerate(batch_files):
+        if batch_file.pending == 0:
+            batch_file.save()
+            continue
+        for index, field_type, follow_ups in batch_file.tasks():
+            queue.put(rank, (rank, batch_file, index, field_type, follow_ups))
+    
+    errors = {"lock": threading.Lock()}
+    start = time.time()
+    threads = [threading.Thread(target=batch_worker, args=(queue, limiter, spend, max_retries, errors), daemon=True)
+               for _ in range(max(1, workers))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    del errors["lock"]
+    for error, count in sorted(errors.items(), key=lambda item: -item[1]):
+        print(f"  {count} field(s) left unchanged: {error}")
+    partial_files = [batch_file.partial_file for batch_file in batch_files
+                     if batch_file.saved_file == batch_file.partial_file]
+    if partial_files:
+        print(f"{len(partial_files)} file(s) saved as .partial.json; run the batch again to finish them")
+    summary = {
+        "files": len(batch_files),
+        "partial_files": len(partial_files),
+        "fields": total_fields,
+        "seconds": round(time.time() - start, 1),
+        "prompt_tokens": spend.prompt_tokens,
+        "completion_tokens": spend.completion_tokens,
+        "spent_usd": round(spend.spent, 4),
+    }
+    print(f"Batch complete: {summary['files']} files, {summary['fields']} fields in {summary['seconds']}s, "
+          f"{summary['prompt_tokens'] + summary['completion_tokens']} tokens, ${summary['spent_usd']:.4f}")
+    return summary
+
+def clean_json_data():
+    """Clean JSON data with AI assistance"""
+    global API_KEY
+    parser = argparse.ArgumentParser(description='Clean JSON data using GPT-4o-mini')
+    parser.add_argument('--input', default=None, help='Input JSON file path')
+    parser.add_argument('--output', default=None, help='Output JSON file path')
+    parser.add_argument('--api-key', default=None, help='OpenAI API key')
+    parser.add_argument('--batch', default=None,
+                        help='Directory or glob of parser outputs to clean with one shared scheduler')
+    parser.add_argument('--workers', type=int, default=8, help='Batch mode: concurrent API requests')
+    parser.add_argument('--rpm', type=int, default=500, help='Batch mode: requests per minute (0 for no limit)')
+    parser.add_argument('--tpm', type=int, default=200000, help='Batch mode: tokens per minute (0 for no limit)')
+    parser.add_argument('--max-spend', type=float, default=None, help='Batch mode: stop after spending this many USD')
+    parser.add_argument('--order', choices=['smallest', 'input'], default='smallest',
+                        help='Batch mode: finish the smallest files first, or keep the input order')
+    parser.add_argument('--max-retries', type=int, default=5, help='Batch mode: retries per request on 429/5xx')
+    parser.add_argument('--overwrite', action='store_true', help='Batch mode: re-clean files that already have output')
+    args = parser.parse_args()
+    
+    # If API key provided as argument, use it
+    if args.api_key:
+        API_KEY = args.api_key
+    
+    if args.batch:
+        input_files = find_batch_inputs(args.batch)
+        if not input_files:
+            print(f"No JSON files found for {args.batch}")
+            return
+        clean_json_batch(input_files, workers=args.workers, requests_per_minute=args.rpm or None,
+                         tokens_per_minute=args.tpm or None, max_spend=args.max_spend, order=args.order,
+                         max_retries=args.max_retries, overwrite=args.overwrite)
+        return
+    
+    # Input and output file paths
+    input_file = args.input or "/Users/lipeiyu/Downloads/小学奥数7大板块题库/应用题专题题库/教师解析版/归一问题.教师版_extracted_text.json"
+    
+    clean_json_file(input_file, args.output)
+    
     print("\nProcessing complete!")
     print("Note: This script requires an OpenAI API key to work properly.")
     print("To use, run: python clean_json_with_ai.py --api-key YOUR_API_KEY")
     print(f"To process different files: python clean_json_with_ai.py --input input.json --output output.json --api-key YOUR_API_KEY")
+    print(f"To process a whole bank: python clean_json_with_ai.py --batch DIRECTORY --api-key YOUR_API_KEY")
 
 if __name__ == "__main__":
     clean_json_data()
@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DOCX to Text Extractor
+
+This script reads a Word (.docx) file directly from its zip/XML structure and
+writes the same marker-delimited text that simple_parser.py expects, without
+going through Microsoft Word, PDF conversion or OCR of the whole page.
+
+- Paragraph and table text is taken verbatim from word/document.xml
+- Word equations (OMML) are converted to LaTeX and wrapped in $...$
+- Embedded images fall back to OCR (via read_pdf_with_ocr.extract_text_from_image)
+
+Legacy binary .doc files are not zip archives and are not supported; convert
+them with doc_to_pdf_converter.py and read_pdf_with_ocr.py instead.
+
+Usage:
+    python docx_to_text.py input.docx [--no-ocr] [--server http://127.0.0.1:8765]
+"""
+
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+
+# XML namespaces used inside a .docx package
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+M_NS = "http://schemas.openxmlformats.org/officeDocument/2006/math"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+A_NS = "http://schemas.openxmlformats.org/drawingml/2006/main"
+V_NS = "urn:schemas-microsoft-com:vml"
+MC_NS = "http://schemas.openxmlformats.org/markup-compatibility/2006"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+
+def w(tag):
+    return f"{{{W_NS}}}{tag}"
+
+
+def m(tag):
+    return f"{{{M_NS}}}{tag}"
+
+
+# Unicode characters in OMML runs that have a LaTeX command equivalent
+LATEX_SYMBOLS = {
+    "×": r"\times ", "÷": r"\div ", "±": r"\pm ", "∓": r"\mp ", "·": r"\cdot ",
+    "⋅": r"\cdot ", "≤": r"\leq ", "≥": r"\geq ", "≠": r"\neq ", "≈": r"\approx ",
+    "≡": r"\equiv ", "∞": r"\infty ", "∠": r"\angle ", "△": r"\triangle ",
+    "⊥": r"\perp ", "∥": r"\parallel ", "°": r"^{\circ}", "∴": r"\therefore ",
+    "∵": r"\because ", "→": r"\rightarrow ", "←": r"\leftarrow ", "⇒": r"\Rightarrow ",
+    "∈": r"\in ", "∉": r"\notin ", "⊂": r"\subset ", "⊆": r"\subseteq ",
+    "∪": r"\cup ", "∩": r"\cap ", "∅": r"\emptyset ", "…": r"\cdots ", "⋯": r"\cdots ",
+    "α": r"\alpha ", "β": r"\beta ", "γ": r"\gamma ", "δ": r"\delta ", "θ": r"\theta ",
+    "λ": r"\lambda ", "μ": r"\mu ", "π": r"\pi ", "σ": r"\sigma ", "φ": r"\varphi ",
+    "ω": r"\omega ", "Δ": r"\Delta ", "Σ": r"\Sigma ", "Ω": r"\Omega ",
+    "%": r"\%", "{": r"\{", "}": r"\}", "#": r"\#", "&": r"\&",
+}
+
+# n-ary operator characters (m:nary/m:chr) and their LaTeX commands
+NARY_OPERATORS = {
+    "∑": r"\sum", "∏": r"\prod", "∫": r"\int", "∬": r"\iint", "∭": r"\iiint",
+    "∮": r"\oint", "⋃": r"\bigcup", "⋂": r"\bigcap",
+}
+
+# Accent characters (m:acc/m:chr) and their LaTeX commands
+ACCENTS = {
+    "̂": r"\hat", "̃": r"\tilde", "̄": r"\bar", "̅": r"\overline",
+    "̇": r"\dot", "̈": r"\ddot", "⃗": r"\vec", "→": r"\vec",
+}
+
+# Delimiter characters (m:d/m:begChr, m:endChr) and their LaTeX forms
+DELIMITERS = {
+    "(": "(", ")": ")", "[": "[", "]": "]", "{": r"\{", "}": r"\}",
+    "|": "|", "‖": r"\|", "⟨": r"\langle", "⟩": r"\rangle", "": ".",
+}
+
+
+def latex_escape(text):
+    """Replace unicode math symbols in a run of OMML text with LaTeX commands"""
+    return "".join(LATEX_SYMBOLS.get(ch, ch) for ch in text)
+
+
+def get_val(parent, path, default=None):
+    """Return the m:val attribute of a property element, e.g. m:fPr/m:type"""
+    if parent is None:
+        return default
+    node = parent.find(path)
+    if node is None:
+        return default
+    return node.get(m("val"), default)
+
+
+def omml_children(node):
+    """Convert all child elements of an OMML node and concatenate the result"""
+    if node is None:
+        return ""
+    return "".join(omml_to_latex(child) for child in node)
+
+
+def omml_arg(node, tag):
+    """Convert an OMML argument element (m:e, m:num, m:sub, ...) to LaTeX"""
+    return omml_children(node.find(m(tag)))
+
+
+def omml_to_latex(node):
+    """
+    Convert a single OMML element to LaTeX
+
+    Args:
+        node: An element from the m: namespace (m:oMath or any of its descendants)
+
+    Returns:
+        str: LaTeX source for the element (without surrounding $ delimiters)
+    """
+    tag = node.tag
+
+    if tag in (m("oMath"), m("e"), m("num"), m("den"), m("sub"), m("sup"),
+               m("deg"), m("lim"), m("fName"), m("box"), m("borderBox")):
+        return omml_children(node)
+
+    if tag == m("r"):
+        return "".join(latex_escape(t.text or "") for t in node.iter(m("t")))
+
+    if tag == m("f"):
+        num = omml_arg(node, "num")
+        den = omml_arg(node, "den")
+        frac_type = get_val(node, f"{m('fPr')}/{m('type')}")
+        if frac_type == "lin":
+            return f"{num}/{den}"
+        if frac_type == "noBar":
+            return f"\\genfrac{{}}{{}}{{0pt}}{{}}{{{num}}}{{{den}}}"
+        return f"\\frac{{{num}}}{{{den}}}"
+
+    if tag == m("sSup"):
+        return f"{{{omml_arg(node, 'e')}}}^{{{omml_arg(node, 'sup')}}}"
+
+    if tag == m("sSub"):
+        return f"{{{omml_arg(node, 'e')}}}_{{{omml_arg(node, 'sub')}}}"
+
+    if tag == m("sSubSup"):
+        return (f"{{{omml_arg(node, 'e')}}}_{{{omml_arg(node, 'sub')}}}"
+                f"^{{{omml_arg(node, 'sup')}}}")
+
+    if tag == m("sPre"):
+        return (f"{{}}_{{{omml_arg(node, 'sub')}}}^{{{omml_arg(node, 'sup')}}}"
+                f"{{{omml_arg(node, 'e')}}}")
+
+    if tag == m("rad"):
+        degree = omml_arg(node, "deg")
+        base = omml_arg(node, "e")
+        if degree:
+            return f"\\sqrt[{degree}]{{{base}}}"
+        return f"\\sqrt{{{base}}}"
+
+    if tag == m("d"):
+        props = node.find(m("dPr"))
+        beg = get_val(props, m("begChr"), "(")
+        end = get_val(props, m("endChr"), ")")
+        sep = get_val(props, m("sepChr"), "|")
+        parts = [omml_children(e) for e in node.findall(m("e"))]
+        body = latex_escape(sep).join(parts)
+        return (f"\\left{DELIMITERS.get(beg, beg)}{body}"
+                f"\\right{DELIMITERS.get(end, end)}")
+
+    if tag == m("nary"):
+        props = node.find(m("naryPr"))
+        char = get_val(props, m("chr"), "∫")
+        operator = NARY_OPERATORS.get(char, latex_escape(char))
+        sub = omml_arg(node, "sub")
+        sup = omml_arg(node, "sup")
+        if sub:
+            operator += f"_{{{sub}}}"
+        if sup:
+            operator += f"^{{{sup}}}"
+        return f"{operator}{{{omml_arg(node, 'e')}}}"
+
+    if tag == m("func"):
+        name = omml_arg(node, "fName").strip()
+        if name and name.isalpha():
+            name = f"\\{name}" if name in ("sin", "cos", "tan", "cot", "log", "ln",
+                                           "lg", "exp", "max", "min", "lim") else name
+        return f"{name} {omml_arg(node, 'e')}"
+
+    if tag == m("acc"):
+        char = get_val(node, f"{m('accPr')}/{m('chr')}", "̂")
+        command = ACCENTS.get(char, r"\hat")
+        return f"{command}{{{omml_arg(node, 'e')}}}"
+
+    if tag == m("bar"):
+        position = get_val(node, f"{m('barPr')}/{m('pos')}", "bot")
+        command = r"\overline" if position == "top" else r"\underline"
+        return f"{command}{{{omml_arg(node, 'e')}}}"
+
+    if tag == m("groupChr"):
+        position = get_val(node, f"{m('groupChrPr')}/{m('pos')}", "bot")
+        command = r"\overbrace" if position == "top" else r"\underbrace"
+        return f"{command}{{{omml_arg(node, 'e')}}}"
+
+    if tag == m("limLow"):
+        return f"{{{omml_arg(node, 'e')}}}_{{{omml_arg(node, 'lim')}}}"
+
+    if tag == m("limUpp"):
+        return f"{{{omml_arg(node, 'e')}}}^{{{omml_arg(node, 'lim')}}}"
+
+    if tag == m("m"):
+        rows = []
+        for row in node.findall(m("mr")):
+            rows.append(" & ".join(omml_children(e) for e in row.findall(m("e"))))
+        return "\\begin{matrix}" + " \\\\ ".join(rows) + "\\end{matrix}"
+
+    if tag == m("eqArr"):
+        rows = [omml_children(e) for e in node.findall(m("e"))]
+        return "\\begin{aligned}" + " \\\\ ".join(rows) + "\\end{aligned}"
+
+    # Property elements (m:rPr, m:fPr, ...) carry no content; anything else
+    # unknown is converted by walking its children
+    if tag.endswith("Pr") or tag == m("ctrlPr"):
+        return ""
+    return omml_children(node)
+
+
+def read_relationships(docx):
+    """Map relationship ids in word/document.xml to package member paths"""
+    rels_path = "word/_rels/document.xml.rels"
+    if rels_path not in docx.namelist():
+        return {}
+
+    root = ET.fromstring(docx.read(rels_path))
+    relationships = {}
+    for rel in root.findall(f"{{{PKG_REL_NS}}}Relationship"):
+        if rel.get("TargetMode") == "External":
+            continue
+        target = rel.get("Target", "")
+        if target.startswith("/"):
+            path = target.lstrip("/")
+        else:
+            path = posixpath.normpath(posixpath.join("word", target))
+        relationships[rel.get("Id")] = path
+    return relationships
+
+
+def usable_ocr_text(text):
+    """Return OCR output, or an empty string if OCR failed"""
+    from read_pdf_with_ocr import ocr_failed
+
+    return "" if ocr_failed(text) else text
+
+
+def fill_deferred_images(text, images, recognize):
+    """
+    Replace the placeholders left by DocxTextExtractor(defer_ocr=True) with OCR text
+
+    Args:
+        text (str): Extracted text containing the placeholders
+        images (list): (placeholder, image_path) pairs from extractor.deferred_images
+        recognize (callable): Takes an image path and returns its text
+
+    Returns:
+        str: The text with every placeholder replaced
+    """
+    for placeholder, image_path in images:
+        text = text.replace(placeholder, usable_ocr_text(recognize(image_path)))
+    return text
+
+
+def save_docx_text(file_path, output_text):
+    """Save extracted text next to the DOCX file and return the output path"""
+    output_path = os.path.splitext(file_path)[0] + "_extracted_text_docx.txt"
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(output_text)
+    print(f"Text saved to: {output_path}")
+    return output_path
+
+
+class DocxTextExtractor:
+    """Walk the body of a .docx document and collect its text in reading order"""
+
+    def __init__(self, docx, use_ocr=True, server_url=None, defer_ocr=False, temp_dir=None):
+        self.docx = docx
+        self.use_ocr = use_ocr
+        self.server_url = server_url
+        # With defer_ocr, images are saved to temp_dir and a placeholder is
+        # emitted for each; fill_deferred_images() replaces them later and the
+        # caller removes temp_dir
+        self.defer_ocr = defer_ocr
+        self.deferred_images = []
+        self.relationships = read_relationships(docx)
+        self.temp_dir = temp_dir
+        self.image_count = 0
+        self.ocr_cache = {}
+        self.page_number = 1
+
+    def image_text(self, rel_id):
+        """Return the OCR text (or a placeholder) for an embedded image"""
+        member = self.relationships.get(rel_id)
+        if not member or member not in self.docx.namelist():
+            return ""
+        if member in self.ocr_cache:
+            return self.ocr_cache[member]
+
+        self.image_count += 1
+        image_name = posixpath.basename(member)
+        if not self.use_ocr:
+            text = f"[Image: {image_name}]"
+        elif self.defer_ocr:
+            text = f"[[DOCX_IMAGE_{self.image_count}]]"
+            self.deferred_images.append((text, self.save_image(member, image_name)))
+        else:
+            text = None
+            if self.server_url:
+                from ocr_server import request_image_ocr
+                try:
+                    text = request_image_ocr(self.server_url, self.docx.read(member), image_name)
+                except Exception as e:
+                    # Stop asking the server for the rest of this document
+                    print(f"OCR server unavailable ({str(e)}), processing images locally")
+                    self.server_url = None
+            if text is None:
+                # Imported here so text-only documents never load the OCR models
+                from read_pdf_with_ocr import extract_text_from_image
+
+                text = extract_text_from_image(self.save_image(member, image_name))
+            text = usable_ocr_text(text)
+
+        self.ocr_cache[member] = text
+        return text
+
+    def save_image(self, member, image_name):
+        """Write an embedded image to the temporary directory and return its path"""
+        if self.temp_dir is None:
+            self.temp_dir = tempfile.mkdtemp()
+        image_path = os.path.join(self.temp_dir, f"image{self.image_count}_{image_name}")
+        with open(image_path, "wb") as image_file:
+            image_file.write(self.docx.read(member))
+        return image_path
+
+    def run_elements(self, element):
+        """Yield the elements of a run in document order, skipping duplicate content
+
+        mc:Fallback repeats its mc:Choice sibling (usually a VML copy of a
+        DrawingML image) and is skipped. Text boxes hold whole paragraphs of
+        their own, so they are yielded but not descended into.
+        """
+        for child in element:
+            if child.tag == f"{{{MC_NS}}}Fallback":
+                continue
+            yield child
+            if child.tag != w("txbxContent"):
+                yield from self.run_elements(child)
+
+    def run_text(self, run):
+        """Collect text from a w:r element, including breaks and images"""
+        parts = []
+        images = set()
+        for child in self.run_elements(run):
+            if child.tag == w("t"):
+                parts.append(child.text or "")
+            elif child.tag == w("tab"):
+                parts.append("\t")
+            elif child.tag in (w("br"), w("cr")):
+                if child.get(w("type")) == "page":
+                    self.page_number += 1
+                    parts.append(f"\n--- Page {self.page_number} ---\n")
+                else:
+                    parts.append("\n")
+            elif child.tag == w("txbxContent"):
+                parts.append(f"\n{self.block_text(child)}\n")
+            elif child.tag in (f"{{{A_NS}}}blip", f"{{{V_NS}}}imagedata"):
+                rel_id = child.get(f"{{{R_NS}}}embed") or child.get(f"{{{R_NS}}}id")
+                # The same picture can be referenced by both a DrawingML and a VML element
+                if rel_id and rel_id not in images:
+                    images.add(rel_id)
+                    parts.append(self.image_text(rel_id))
+        return "".join(parts)
+
+    def paragraph_text(self, paragraph):
+        """Collect the text of a w:p element in document order"""
+        parts = []
+        for child in paragraph:
+            if child.tag == w("r"):
+                parts.append(self.run_text(child))
+            elif child.tag == m("oMath"):
+                parts.append(f"${omml_to_latex(child).strip()}$")
+            elif child.tag == m("oMathPara"):
+                for math in child.iter(m("oMath")):
+                    parts.append(f"$${omml_to_latex(math).strip()}$$")
+            elif child.tag in (w("hyperlink"), w("ins"), w("smartTag"),
+                               w("fldSimple"), w("sdt"), w("sdtContent")):
+                parts.append(self.paragraph_text(child))
+        return "".join(parts)
+
+    def block_text(self, container):
+        """Collect the text of paragraphs and tables inside a body-like element"""
+        lines = []
+        for child in container:
+            if child.tag == w("p"):
+                lines.append(self.paragraph_text(child))
+            elif child.tag == w("tbl"):
+                for row in child.findall(w("tr")):
+                    cells = [self.block_text(cell).strip() for cell in row.findall(w("tc"))]
+                    lines.append("\t".join(cells))
+            elif child.tag == w("sdt"):
+                content = child.find(w("sdtContent"))
+                if content is not None:
+                    lines.append(self.block_text(content))
+        return "\n".join(lines)
+
+    def extract(self):
+        """Return the full text of the document"""
+        root = ET.fromstring(self.docx.read("word/document.xml"))
+        body = root.find(w("body"))
+        if body is None:
+            return ""
+        try:
+            text = self.block_text(body)
+        finally:
+            if self.temp_dir is not None and not self.defer_ocr:
+                shutil.rmtree(self.temp_dir, ignore_errors=True)
+                self.temp_dir = None
+        return f"--- Page 1 ---\n{text}"
+
+
+def read_docx(file_path, save_output=True, use_ocr=True, server_url=None):
+    """
+    Read a DOCX file and extract its text, equations and image OCR text
+
+    Args:
+        file_path (str): Path to the .docx file
+        save_output (bool): Write the text next to the input file
+        use_ocr (bool): OCR embedded images; if False, emit an [Image: ...] placeholder
+        server_url (str): Send images to a running ocr_server.py instead of loading the models
+
+    Returns:
+        str: The extracted text, or an error message if extraction failed
+    """
+    try:
+        print(f"Processing DOCX file: {file_path}")
+
+        with zipfile.ZipFile(file_path) as docx:
+            extractor = DocxTextExtractor(docx, use_ocr=use_ocr, server_url=server_url)
+            output_text = extractor.extract()
+        print(f"Found {extractor.image_count} embedded images")
+
+        if save_output:
+            save_docx_text(file_path, output_text)
+
+        return output_text
+
+    except (zipfile.BadZipFile, KeyError) as e:
+        error_msg = f"Error processing DOCX: not a valid .docx file ({str(e)})"
+        print(error_msg)
+        return error_msg
+    except Exception as e:
+        error_msg = f"Error processing DOCX: {str(e)}"
+        print(error_msg)
+        return error_msg
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract text and equations from DOCX files without Word or OCR')
+    parser.add_argument('input', help='Input .docx file path')
+    parser.add_argument('--no-ocr', action='store_true', help='Do not OCR embedded images')
+    parser.add_argument('--server', default=os.environ.get("OCR_SERVER_URL"),
+                        help='Send images to a running ocr_server.py (e.g. http://127.0.0.1:8765)')
+    args = parser.parse_args()
+
+    content = read_docx(args.input, use_ocr=not args.no_ocr, server_url=args.server)
+    print("\nDocument Content Preview (first 500 characters):")
+    print("-" * 80)
+    if len(content) > 500:
+        print(content[:500] + "...")
+    else:
+        print(content)
+    print("-" * 80)
+    if content.startswith("Error processing DOCX"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Folder Watcher
+
+Reports new or changed .pdf/.docx files in a set of directories, for the
+--watch mode of run_pdf_to_json_pipeline.py.
+
+- On Linux, filesystem events come from inotify (through ctypes, no extra
+  dependency); elsewhere, or if inotify is unavailable, the directories are
+  polled with os.scandir
+- Files are only reported once they have been quiet for a settle period and
+  their size and mtime stopped changing, so partially written files are skipped
+- A file is reported again only if its size or mtime changed since it was last reported
+- Deleted and moved-away files are forgotten, so a long-running watcher only
+  keeps state for the files that currently exist
+"""
+
+import os
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+
+WATCHED_EXTENSIONS = (".pdf", ".docx")
+DEFAULT_SETTLE_SECONDS = 2.0
+DEFAULT_POLL_INTERVAL = 2.0
+
+# inotify event masks (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_REMOVED = IN_DELETE | IN_MOVED_FROM
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_REMOVED
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_watched_file(path):
+    """True for .pdf/.docx files that are not editor lock or hidden files"""
+    name = os.path.basename(path)
+    if name.startswith("~$") or name.startswith("."):
+        return False
+    return name.lower().endswith(WATCHED_EXTENSIONS)
+
+
+def file_signature(path):
+    """(size, mtime) of a file, or None if it no longer exists"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def scan_directory(directory):
+    """Return {path: signature} for every watched file in a directory"""
+    files = {}
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file() and is_watched_file(entry.path):
+                    stat = entry.stat()
+                    files[entry.path] = (stat.st_size, stat.st_mtime_ns)
+    except OSError:
+        pass
+    return files
+
+
+class InotifyWatcher:
+    """Filesystem events from Linux inotify"""
+
+    name = "inotify"
+
+    def __init__(self, directories):
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("libc not found")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available on this platform")
+
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | getattr(os, "O_CLOEXEC", 0))
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.directories = {}
+        for directory in directories:
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                os.close(self.fd)
+                raise OSError(error, f"inotify_add_watch failed for {directory}")
+            self.directories[wd] = directory
+
+    def wait(self, timeout):
+        """Block up to timeout seconds and return the sets of paths that changed and that were removed"""
+        changed = set()
+        removed = set()
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return changed, removed
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return changed, removed
+            raise
+
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, name_length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + name_length].rstrip(b"\0")
+            offset += name_length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped; fall back to a one-off scan of every directory
+                for directory in self.directories.values():
+                    changed.update(scan_directory(directory))
+                continue
+            directory = self.directories.get(wd)
+            if directory and name:
+                path = os.path.join(directory, os.fsdecode(name))
+                if not is_watched_file(path):
+                    continue
+                # Events arrive in order, so the last one decides (e.g. delete then re-create)
+                if mask & IN_REMOVED:
+                    changed.discard(path)
+                    removed.add(path)
+                else:
+                    removed.discard(path)
+                    changed.add(path)
+        return changed, removed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Portable fallback that compares directory listings every poll interval"""
+
+    name = "polling"
+
+    def __init__(self, directories, interval=DEFAULT_POLL_INTERVAL):
+        self.directories = list(directories)
+        self.interval = interval
+        self.last_poll = time.monotonic()
+        self.known = {}
+        for directory in self.directories:
+            self.known.update(scan_directory(directory))
+
+    def wait(self, timeout):
+        """Sleep for timeout seconds and return (changed, removed) paths, scanning at most once per interval"""
+        time.sleep(timeout)
+        if time.monotonic() - self.last_poll < self.interval:
+            return set(), set()
+        self.last_poll = time.monotonic()
+        current = {}
+        for directory in self.directories:
+            current.update(scan_directory(directory))
+        changed = {path for path, signature in current.items() if self.known.get(path) != signature}
+        removed = set(self.known) - set(current)
+        self.known = current
+        return changed, removed
+
+    def close(self):
+        pass
+
+
+def create_watcher(directories, use_polling=False, poll_interval=DEFAULT_POLL_INTERVAL):
+    """Return an inotify watcher, or a polling watcher if inotify is unavailable"""
+    if not use_polling:
+        try:
+            return InotifyWatcher(directories)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({str(e)}), falling back to polling every {poll_interval}s")
+    return PollingWatcher(directories, poll_interval)
+
+
+class Debouncer:
+    """Hold changed files until they are quiet and stable, then report each version once"""
+
+    def __init__(self, settle_seconds=DEFAULT_SETTLE_SECONDS):
+        self.settle_seconds = settle_seconds
+        self.pending = {}       # path -> (last event time, last seen signature)
+        self.reported = {}      # path -> signature when last reported
+
+    def mark_reported(self, path, signature=None):
+        """Remember a file version so it is not reported again (e.g. already processed)"""
+        self.reported[path] = signature or file_signature(path)
+
+    def forget(self, path):
+        """Drop all state for a file that was deleted or moved away"""
+        self.pending.pop(path, None)
+        self.reported.pop(path, None)
+
+    def touch(self, path, now=None):
+        """Record a filesystem event for a path"""
+        now = time.monotonic() if now is None else now
+        self.pending[path] = (now, file_signature(path))
+
+    def ready(self, now=None):
+        """Return the pending files that have settled and changed since they were last reported"""
+        now = time.monotonic() if now is None else now
+        settled = []
+        for path, (last_event, last_signature) in list(self.pending.items()):
+            if now - last_event < self.settle_seconds:
+                continue
+            signature = file_signature(path)
+            if signature is None:
+                # Deleted or renamed away before it settled
+                del self.pending[path]
+                self.reported.pop(path, None)
+                continue
+            if signature != last_signature:
+                # Still being written; wait another settle period
+                self.pending[path] = (now, signature)
+                continue
+            del self.pending[path]
+            if self.reported.get(path) != signature:
+                self.reported[path] = signature
+                settled.append(path)
+        return sorted(settled)
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OCR Server
+
+Keeps the Pix2Text models loaded in a long-running process and accepts OCR
+jobs over localhost HTTP, so ad-hoc runs of read_pdf_with_ocr.py and the
+pipeline only pay for inference instead of model loading.
+
+Endpoints:
+    POST /ocr/pdf     JSON body {"path": "/abs/file.pdf", "save_output": true}
+    POST /ocr/image   Raw image bytes (optional ?name=formula.png)
+    GET  /health      Server status, queue size and processed job count
+
+Jobs go into a bounded queue and are processed by a single worker thread that
+owns the model. The worker drains up to --batch-size queued jobs at a time
+and runs them back to back. When the queue is full the server answers
+503 with a Retry-After header; the client functions below retry on 503.
+
+Usage:
+    python ocr_server.py [--host 127.0.0.1] [--port 8765] [--queue-size 16]
+    python read_pdf_with_ocr.py file.pdf --server http://127.0.0.1:8765
+"""
+
+import os
+import json
+import time
+import queue
+import shutil
+import argparse
+import tempfile
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_QUEUE_SIZE = 16
+DEFAULT_BATCH_SIZE = 8
+JOB_TIMEOUT = 1800          # Seconds a request waits for its job to finish
+RETRY_AFTER = 2             # Seconds clients are asked to wait when the queue is full
+MAX_IMAGE_BYTES = 50 * 1024 * 1024
+
+
+def log_message(message, error=False):
+    """Print a timestamped log message"""
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    prefix = "[ERROR]" if error else "[INFO]"
+    print(f"{prefix} {timestamp} - {message}", flush=True)
+
+
+class OCRJob:
+    """A single unit of work waiting for the OCR worker"""
+
+    def __init__(self, kind, payload):
+        self.kind = kind            # "pdf" or "image"
+        self.payload = payload
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class OCRWorker:
+    """Owns the warm Pix2Text model and processes queued jobs in batches"""
+
+    def __init__(self, queue_size=DEFAULT_QUEUE_SIZE, batch_size=DEFAULT_BATCH_SIZE):
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        self.processed = 0
+        self.failed = 0
+        self.busy = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        """Load the models and start the worker thread"""
+        from read_pdf_with_ocr import get_pix2text
+
+        start = time.perf_counter()
+        get_pix2text()
+        log_message(f"Pix2Text models loaded in {time.perf_counter() - start:.1f}s")
+        self.thread.start()
+
+    def submit(self, kind, payload):
+        """Queue a job; returns None if the queue is full (backpressure)"""
+        job = OCRJob(kind, payload)
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            return None
+        return job
+
+    def next_batch(self):
+        """Block for one job, then take up to batch_size - 1 more without waiting"""
+        batch = [self.jobs.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.jobs.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        from read_pdf_with_ocr import read_pdf_with_ocr, extract_text_from_image
+
+        while True:
+            batch = self.next_batch()
+            self.busy = True
+            temp_dir = tempfile.mkdtemp()
+            start = time.perf_counter()
+            try:
+                for index, job in enumerate(batch):
+                    try:
+                        if job.kind == "pdf":
+                            job.result = read_pdf_with_ocr(job.payload["path"],
+                                                           save_output=job.payload.get("save_output", True))
+                            if job.result.startswith("Error processing PDF"):
+                                job.error = job.result
+                        else:
+                            name = os.path.basename(job.payload.get("name") or "image.png")
+                            image_path = os.path.join(temp_dir, f"job{index}_{name}")
+                            with open(image_path, "wb") as image_file:
+                                image_file.write(job.payload["data"])
+                            job.result = extract_text_from_image(image_path)
+                    except Exception as e:
+                        job.error = str(e)
+                    if job.error:
+                        self.failed += 1
+                    self.processed += 1
+                    job.done.set()
+            finally:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+                self.busy = False
+            log_message(f"Processed batch of {len(batch)} job(s) in {time.perf_counter() - start:.2f}s, "
+                        f"{self.jobs.qsize()} queued")
+
+
+class OCRRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front end that turns requests into OCR jobs"""
+
+    worker = None
+
+    def send_json(self, status, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if length > MAX_IMAGE_BYTES:
+            raise ValueError(f"Request body too large ({length} bytes)")
+        return self.rfile.read(length) if length else b""
+
+    def do_GET(self):
+        if urllib.parse.urlparse(self.path).path != "/health":
+            self.send_json(404, {"error": "Not found"})
+            return
+        self.send_json(200, {
+            "status": "ok",
+            "queued": self.worker.jobs.qsize(),
+            "queue_size": self.worker.jobs.maxsize,
+            "busy": self.worker.busy,
+            "processed": self.worker.processed,
+            "failed": self.worker.failed,
+        })
+
+    def do_POST(self):
+        url = urllib.parse.urlparse(self.path)
+        try:
+            body = self.read_body()
+            if url.path == "/ocr/pdf":
+                payload = json.loads(body.decode("utf-8") or "{}")
+                if not isinstance(payload, dict):
+                    self.send_json(400, {"error": "Expected a JSON object"})
+                    return
+                if not isinstance(payload.get("path"), str) or not os.path.isfile(payload["path"]):
+                    self.send_json(400, {"error": f"PDF not found: {payload.get('path')}"})
+                    return
+                job = self.worker.submit("pdf", payload)
+            elif url.path == "/ocr/image":
+                if not body:
+                    self.send_json(400, {"error": "Empty image body"})
+                    return
+                name = urllib.parse.parse_qs(url.query).get("name", ["image.png"])[0]
+                job = self.worker.submit("image", {"data": body, "name": name})
+            else:
+                self.send_json(404, {"error": "Not found"})
+                return
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)})
+            return
+
+        if job is None:
+            self.send_json(503, {"error": "OCR queue is full"}, {"Retry-After": str(RETRY_AFTER)})
+            return
+        if not job.done.wait(JOB_TIMEOUT):
+            self.send_json(504, {"error": "OCR job timed out"})
+            return
+        if job.error:
+            self.send_json(500, {"error": job.error})
+            return
+        self.send_json(200, {"text": job.result})
+
+    def log_message(self, format, *args):
+        log_message(f"{self.address_string()} {format % args}")
+
+
+def post_job(server_url, path, body, content_type, retries=30, timeout=JOB_TIMEOUT):
+    """Send a job to the OCR server, waiting and retrying while its queue is full"""
+    url = server_url.rstrip("/") + path
+    for attempt in range(retries + 1):
+        request = urllib.request.Request(url, data=body, headers={"Content-Type": content_type})
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return json.loads(response.read().decode("utf-8"))["text"]
+        except urllib.error.HTTPError as e:
+            if e.code == 503 and attempt < retries:
+                time.sleep(float(e.headers.get("Retry-After") or RETRY_AFTER))
+                continue
+            try:
+                message = json.loads(e.read().decode("utf-8")).get("error", str(e))
+            except Exception:
+                message = str(e)
+            raise RuntimeError(f"OCR server error ({e.code}): {message}")
+    raise RuntimeError("OCR server queue stayed full")
+
+
+def request_pdf_ocr(server_url, pdf_path, save_output=True):
+    """Ask the OCR server to process a PDF file and return the extracted text"""
+    body = json.dumps({"path": os.path.abspath(pdf_path), "save_output": save_output}).encode("utf-8")
+    return post_job(server_url, "/ocr/pdf", body, "application/json")
+
+
+def request_image_ocr(server_url, image_bytes, name="image.png"):
+    """Ask the OCR server to recognize an image and return the text"""
+    path = "/ocr/image?" + urllib.parse.urlencode({"name": name})
+    return post_job(server_url, path, image_bytes, "application/octet-stream")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve OCR jobs from a warm Pix2Text model over localhost HTTP')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='Address to listen on')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Port to listen on')
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help='Maximum number of queued jobs before requests get 503')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help='Maximum number of jobs processed per batch')
+    args = parser.parse_args()
+
+    worker = OCRWorker(queue_size=args.queue_size, batch_size=args.batch_size)
+    worker.start()
+
+    OCRRequestHandler.worker = worker
+    server = ThreadingHTTPServer((args.host, args.port), OCRRequestHandler)
+    server.daemon_threads = True
+    log_message(f"OCR server listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        log_message("Shutting down OCR server")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
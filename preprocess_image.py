@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Image Preprocessing for OCR
+
+Shrinks images before they are passed to Pix2Text. Scanned pages often embed
+very large images for a single line of text or a formula, and OCR cost grows
+with the number of pixels, so this script:
+
+1. Converts the image to grayscale (optionally binarizes it with Otsu's threshold)
+2. Trims the blank margins around the content
+3. Downscales the result to a maximum DPI and/or pixel budget
+
+All steps are vectorized with NumPy. The crop box and scale factor are kept so
+coordinates in the processed image can be mapped back to the original.
+
+Usage:
+    python preprocess_image.py input.png [-o output.png] [--binarize]
+"""
+
+import os
+import argparse
+import numpy as np
+from PIL import Image
+
+# Defaults used by read_pdf_with_ocr.py
+MAX_PIXELS = 2_000_000      # Pixel budget (width * height) after preprocessing
+MAX_DPI = 300               # Only applied when the image carries DPI metadata
+WHITE_THRESHOLD = 245       # Gray level at or above which a pixel counts as background
+TRIM_PADDING = 8            # Pixels of margin kept around the content
+
+
+def to_grayscale(img):
+    """Return a 2-D uint8 array of the image in grayscale, with transparency on white"""
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        rgba = img.convert("RGBA")
+        background = Image.new("RGBA", rgba.size, (255, 255, 255, 255))
+        img = Image.alpha_composite(background, rgba)
+    return np.asarray(img.convert("L"), dtype=np.uint8)
+
+
+def otsu_threshold(gray):
+    """Compute Otsu's binarization threshold for a grayscale array"""
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    total = gray.size
+    if total == 0:
+        return 128
+
+    levels = np.arange(256, dtype=np.float64)
+    weight_bg = np.cumsum(hist)
+    weight_fg = total - weight_bg
+    cum_mean = np.cumsum(hist * levels)
+    mean_bg = np.divide(cum_mean, weight_bg, out=np.zeros(256), where=weight_bg > 0)
+    mean_fg = np.divide(cum_mean[-1] - cum_mean, weight_fg, out=np.zeros(256), where=weight_fg > 0)
+    between_var = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    return int(np.argmax(between_var))
+
+
+def content_bounding_box(gray, white_threshold=WHITE_THRESHOLD, padding=TRIM_PADDING):
+    """
+    Find the bounding box of non-background pixels
+
+    Returns:
+        tuple: (left, top, right, bottom) with right/bottom exclusive, or the
+               full image box if the image is blank
+    """
+    height, width = gray.shape
+    mask = gray < white_threshold
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    if rows.size == 0 or cols.size == 0:
+        return (0, 0, width, height)
+
+    top = max(int(rows[0]) - padding, 0)
+    bottom = min(int(rows[-1]) + 1 + padding, height)
+    left = max(int(cols[0]) - padding, 0)
+    right = min(int(cols[-1]) + 1 + padding, width)
+    return (left, top, right, bottom)
+
+
+def compute_scale(width, height, max_pixels=MAX_PIXELS, max_dpi=MAX_DPI, dpi=None):
+    """Return the downscale factor (<= 1.0) that satisfies the DPI and pixel limits"""
+    scale = 1.0
+    if max_pixels and width * height > max_pixels:
+        scale = min(scale, (max_pixels / float(width * height)) ** 0.5)
+    if max_dpi and dpi and dpi > max_dpi:
+        scale = min(scale, max_dpi / float(dpi))
+    return scale
+
+
+def preprocess_image(img, max_pixels=MAX_PIXELS, max_dpi=MAX_DPI, binarize=False,
+                     trim=True, white_threshold=WHITE_THRESHOLD, padding=TRIM_PADDING):
+    """
+    Prepare an image for OCR
+
+    Args:
+        img: A PIL image or a path to an image file
+        max_pixels (int): Pixel budget for the output; None or 0 disables it
+        max_dpi (int): Maximum DPI for images with DPI metadata; None or 0 disables it
+        binarize (bool): Convert to pure black and white using Otsu's threshold
+        trim (bool): Crop blank margins around the content
+        white_threshold (int): Gray level treated as background when trimming
+        padding (int): Margin kept around the content when trimming
+
+    Returns:
+        tuple: (processed PIL image in mode "L", mapping dict) where the mapping
+               holds the original size, the crop box in original coordinates
+               and the scale factor applied after cropping
+    """
+    if isinstance(img, (str, os.PathLike)):
+        with Image.open(img) as source:
+            source.load()
+            img = source.copy()
+
+    original_size = img.size
+    dpi_info = img.info.get("dpi")
+    dpi = float(max(dpi_info)) if dpi_info else None
+
+    gray = to_grayscale(img)
+
+    crop_box = (0, 0, gray.shape[1], gray.shape[0])
+    if trim:
+        crop_box = content_bounding_box(gray, white_threshold, padding)
+        left, top, right, bottom = crop_box
+        gray = gray[top:bottom, left:right]
+
+    if binarize:
+        threshold = otsu_threshold(gray)
+        gray = np.where(gray > threshold, 255, 0).astype(np.uint8)
+
+    processed = Image.fromarray(np.ascontiguousarray(gray))
+
+    scale = compute_scale(processed.width, processed.height, max_pixels, max_dpi, dpi)
+    if scale < 1.0:
+        new_size = (max(1, int(round(processed.width * scale))),
+                    max(1, int(round(processed.height * scale))))
+        # Scale factor actually used, per axis, after rounding to whole pixels
+        scale = new_size[0] / float(processed.width)
+        processed = processed.resize(new_size, Image.LANCZOS)
+
+    mapping = {
+        "original_size": original_size,
+        "crop_box": crop_box,
+        "scale": scale,
+        "processed_size": processed.size,
+    }
+    return processed, mapping
+
+
+def map_to_original(x, y, mapping):
+    """Map a point in the processed image back to original image coordinates"""
+    left, top = mapping["crop_box"][:2]
+    scale = mapping["scale"] or 1.0
+    return (left + x / scale, top + y / scale)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Trim, downscale and binarize images before OCR')
+    parser.add_argument('input', help='Input image path')
+    parser.add_argument('-o', '--output', help='Output image path (default: <input>_preprocessed.png)')
+    parser.add_argument('--max-pixels', type=int, default=MAX_PIXELS, help='Pixel budget for the output image')
+    parser.add_argument('--max-dpi', type=int, default=MAX_DPI, help='Maximum DPI for images with DPI metadata')
+    parser.add_argument('--binarize', action='store_true', help='Convert to black and white')
+    parser.add_argument('--no-trim', action='store_true', help='Keep the blank margins')
+    args = parser.parse_args()
+
+    output_path = args.output or os.path.splitext(args.input)[0] + "_preprocessed.png"
+    processed, mapping = preprocess_image(args.input, max_pixels=args.max_pixels, max_dpi=args.max_dpi,
+                                          binarize=args.binarize, trim=not args.no_trim)
+    processed.save(output_path, "PNG")
+
+    original_width, original_height = mapping["original_size"]
+    print(f"Original size: {original_width}x{original_height}")
+    print(f"Crop box: {mapping['crop_box']}")
+    print(f"Scale: {mapping['scale']:.3f}")
+    print(f"Processed size: {processed.width}x{processed.height}")
+    print(f"Saved to: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,47 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import sys
 import os
-import io
+import sys
 import tempfile
 import shutil
-import subprocess
-import re
-from PIL import Image
-import pix2text
-import fitz  # PyMuPDF
+import argparse
+import threading
+
+# Heavy dependencies (pix2text pulls in torch and the OCR models, numpy and
+# PIL are only needed for images) are imported inside the functions that use
+# them, so text-only PDFs and --help never pay for loading them.
+# benchmarks/import_time.py checks that this stays true.
+
+# Image preprocessing before OCR; the pixel and DPI limits are
+# preprocess_image.MAX_PIXELS and preprocess_image.MAX_DPI
+PREPROCESS_IMAGES = True
+OCR_BINARIZE = False
+
+# Pix2Text instance, loaded on first use and reused for every later image
+_pix2text_model = None
+_pix2text_lock = threading.Lock()
+
+def get_pix2text():
+    """Load the Pix2Text models on first use and return the shared instance"""
+    global _pix2text_model
+    if _pix2text_model is None:
+        # Threads that ask at the same time wait for one load instead of each loading the models
+        with _pix2text_lock:
+            if _pix2text_model is None:
+                import pix2text
+                print("Loading Pix2Text models...")
+                _pix2text_model = pix2text.Pix2Text()
+    return _pix2text_model
+
+# extract_text_from_image reports a failed image with a bracketed message
+# starting with one of these instead of raising
+OCR_FAILURE_PREFIXES = ("[Failed to convert", "[OCR failed", "[OCR extraction failed",
+                        "[OCR Error", "[Image processing error")
+
+def ocr_failed(text):
+    """True if OCR produced nothing usable for an image"""
+    return not text or text.startswith(OCR_FAILURE_PREFIXES)
 
 def convert_image_to_png(image_path, output_dir):
     """Convert any image format to PNG for better OCR processing"""
@@ -20,6 +51,7 @@ def convert_image_to_png(image_path, output_dir):
         png_path = os.path.join(output_dir, f"{basename}.png")
         
         # Use PIL to convert to PNG
+        from PIL import Image
         img = Image.open(image_path)
         img.save(png_path, "PNG")
         
@@ -29,25 +61,71 @@ def convert_image_to_png(image_path, output_dir):
         print(f"Exception converting image to PNG: {str(e)}")
         return None
 
-def extract_text_from_image(image_path):
-    """Extract text from an image using Pix2Text for better math formula recognition"""
+def preprocess_image_for_ocr(image_path, output_dir):
+    """Trim, downscale and convert an image to grayscale PNG before OCR
+
+    Returns the path of the preprocessed PNG and the mapping back to the
+    original image, or (None, None) if preprocessing failed.
+    """
+    try:
+        from preprocess_image import preprocess_image
+
+        basename = os.path.splitext(os.path.basename(image_path))[0]
+        processed_path = os.path.join(output_dir, f"{basename}_ocr.png")
+        processed, mapping = preprocess_image(image_path, binarize=OCR_BINARIZE)
+        processed.save(processed_path, "PNG")
+
+        original_width, original_height = mapping["original_size"]
+        print(f"Preprocessed {os.path.basename(image_path)}: {original_width}x{original_height} -> "
+              f"{processed.width}x{processed.height} (crop {mapping['crop_box']}, scale {mapping['scale']:.3f})")
+        return processed_path, mapping
+    except Exception as e:
+        print(f"Exception preprocessing image: {str(e)}")
+        return None, None
+
+def extract_text_from_image(image_path, preprocess=None):
+    """Extract text from an image using Pix2Text for better math formula recognition
+
+    preprocess defaults to the module-level PREPROCESS_IMAGES setting.
+    """
+    if preprocess is None:
+        preprocess = PREPROCESS_IMAGES
+    # Preprocessed and converted copies go to a scratch directory that is
+    # removed afterwards, so nothing is left next to the original image
+    # Pix2Text for better math recognition (models are loaded once per process).
+    # Loaded before the per-image error handling: a missing or broken OCR stack
+    # is not a problem with this image and must not be reported as OCR text
+    p2t = get_pix2text()
+
+    work_dir = tempfile.mkdtemp()
     try:
+        # Trim margins and downscale the image to cut OCR time and memory;
+        # the size heuristic below uses the trimmed size at original resolution
+        content_size = None
+        processed_path = None
+        if preprocess:
+            processed_path, mapping = preprocess_image_for_ocr(image_path, work_dir)
+            if processed_path:
+                left, top, right, bottom = mapping["crop_box"]
+                content_size = (right - left, bottom - top)
+                image_path = processed_path
+
         # Convert image to PNG if needed
-        if not image_path.lower().endswith('.png'):
-            output_dir = os.path.dirname(image_path)
-            png_path = convert_image_to_png(image_path, output_dir)
+        if not processed_path and not image_path.lower().endswith('.png'):
+            png_path = convert_image_to_png(image_path, work_dir)
             if png_path:
                 image_path = png_path
             else:
                 return f"[Failed to convert image file: {os.path.basename(image_path)}]"
         
-        # Initialize Pix2Text for better math recognition
-        p2t = pix2text.Pix2Text()
-        
         # Check if the image seems like it contains math formulas
         # We'll use a simple heuristic - if the image is small, it's more likely to be a formula
-        img = Image.open(image_path)
-        width, height = img.size
+        if content_size:
+            width, height = content_size
+        else:
+            from PIL import Image
+            img = Image.open(image_path)
+            width, height = img.size
         
         # Use the appropriate extraction method based on content type
         try:
@@ -87,9 +165,13 @@ def extract_text_from_image(image_path):
     except Exception as e:
         print(f"Image processing error: {str(e)}")
         return f"[Image processing error: {str(e)}]"
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
 
 def extract_images_from_pdf(pdf_path, output_dir=None):
     """Extract all images from a PDF file to the specified directory"""
+    import fitz  # PyMuPDF
+
     if output_dir is None:
         output_dir = tempfile.mkdtemp()
     
@@ -141,6 +223,48 @@ def extract_images_from_pdf(pdf_path, output_dir=None):
         print(f"Error extracting images from PDF: {str(e)}")
         return []
 
+def extract_text_layer(file_path):
+    """Extract the text layer of a PDF, one "--- Page N ---" block per non-empty page"""
+    import fitz  # PyMuPDF
+
+    # Open the PDF
+    pdf_document = fitz.open(file_path)
+    page_count = len(pdf_document)
+    print(f"PDF has {page_count} pages")
+    
+    # Extract all text content from the PDF
+    all_text = []
+    for page_index in range(page_count):
+        page = pdf_document[page_index]
+        page_text = page.get_text()
+        if page_text.strip():
+            all_text.append(f"--- Page {page_index + 1} ---\n{page_text}")
+    return all_text
+
+def ocr_images(image_paths, recognize=None):
+    """Run OCR on extracted images, returning one "--- OCR Text from Image N ---" block per image
+
+    recognize defaults to extract_text_from_image; any callable taking an
+    image path and returning text (e.g. an OCR server client) can be used.
+    """
+    recognize = recognize or extract_text_from_image
+    ocr_blocks = []
+    print("Performing OCR on extracted images...")
+    for i, image_path in enumerate(image_paths):
+        ocr_text = recognize(image_path)
+        if not ocr_failed(ocr_text):
+            image_name = os.path.basename(image_path)
+            ocr_blocks.append(f"\n--- OCR Text from Image {i+1} ({image_name}) ---\n{ocr_text}")
+    return ocr_blocks
+
+def save_extracted_text(file_path, output_text):
+    """Save extracted text next to the PDF and return the output path"""
+    output_path = os.path.splitext(file_path)[0] + "_extracted_text_pdf.txt"
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(output_text)
+    print(f"Text saved to: {output_path}")
+    return output_path
+
 def read_pdf_with_ocr(file_path, save_output=True):
     """
     Read a PDF file and extract both text and images with OCR
@@ -151,29 +275,12 @@ def read_pdf_with_ocr(file_path, save_output=True):
         # Create temporary directory for extracted images
         temp_dir = tempfile.mkdtemp()
         
-        # Open the PDF
-        pdf_document = fitz.open(file_path)
-        page_count = len(pdf_document)
-        print(f"PDF has {page_count} pages")
-        
         # Extract all text content from the PDF
-        all_text = []
-        for page_index in range(page_count):
-            page = pdf_document[page_index]
-            page_text = page.get_text()
-            if page_text.strip():
-                all_text.append(f"--- Page {page_index + 1} ---\n{page_text}")
+        all_text = extract_text_layer(file_path)
         
         # Extract images and perform OCR
         image_paths = extract_images_from_pdf(file_path, temp_dir)
-        
-        # Process each image with OCR
-        print("Performing OCR on extracted images...")
-        for i, image_path in enumerate(image_paths):
-            ocr_text = extract_text_from_image(image_path)
-            if ocr_text and not ocr_text.startswith("[OCR Error") and not ocr_text.startswith("[Failed"):
-                image_name = os.path.basename(image_path)
-                all_text.append(f"\n--- OCR Text from Image {i+1} ({image_name}) ---\n{ocr_text}")
+        all_text.extend(ocr_images(image_paths))
         
         # Combine all content
         output_text = "\n\n".join(all_text)
@@ -186,10 +293,7 @@ def read_pdf_with_ocr(file_path, save_output=True):
         
         # Save the output to a text file
         if save_output:
-            output_path = os.path.splitext(file_path)[0] + "_extracted_text_pdf.txt"
-            with open(output_path, "w", encoding="utf-8") as f:
-                f.write(output_text)
-            print(f"Text saved to: {output_path}")
+            save_extracted_text(file_path, output_text)
         
         return output_text
     
@@ -199,14 +303,27 @@ def read_pdf_with_ocr(file_path, save_output=True):
         return error_msg
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        file_path = sys.argv[1]
-    else:
-        # Default path for testing
-        file_path = "/Users/lipeiyu/Downloads/小学奥数7大板块题库/应用题专题题库/教师解析版/6-1-3 还原问题（一）.教师版.pdf"
+    parser = argparse.ArgumentParser(description='Extract text from a PDF file, using OCR for embedded images')
+    # Default path for testing
+    parser.add_argument('file_path', nargs='?',
+                        default="/Users/lipeiyu/Downloads/小学奥数7大板块题库/应用题专题题库/教师解析版/6-1-3 还原问题（一）.教师版.pdf",
+                        help='Input PDF file path')
+    parser.add_argument('--server', default=os.environ.get("OCR_SERVER_URL"),
+                        help='Send the job to a running ocr_server.py (e.g. http://127.0.0.1:8765)')
+    args = parser.parse_args()
+    file_path = args.file_path
     
     print(f"Processing file: {file_path}")
-    content = read_pdf_with_ocr(file_path)
+    content = None
+    if args.server:
+        from ocr_server import request_pdf_ocr
+        try:
+            content = request_pdf_ocr(args.server, file_path)
+            print(f"Processed by OCR server at {args.server}")
+        except Exception as e:
+            print(f"OCR server unavailable ({str(e)}), processing locally")
+    if content is None:
+        content = read_pdf_with_ocr(file_path)
     print("\nDocument Content Preview (first 500 characters):")
     print("-" * 80)
     if len(content) > 500:
@@ -214,4 +331,6 @@ if __name__ == "__main__":
     else:
         print(content)
     print("-" * 80)
+    if content.startswith("Error processing PDF"):
+        sys.exit(1)
     print(f"Complete content has been saved to a text file.")
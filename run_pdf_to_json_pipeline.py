@@ -3,24 +3,55 @@
 PDF to JSON Conversion Pipeline
 
 This script automates the process of:
-1. Converting PDF files to text using OCR (via read_pdf_with_ocr.py)
+1. Converting PDF files to text using OCR (via read_pdf_with_ocr.py), or
+   reading DOCX files directly (via docx_to_text.py)
 2. Parsing the extracted text into structured JSON (via simple_parser.py)
+3. Optionally cleaning the JSON with AI (via clean_json_with_ai.py, --clean)
+
+By default each file runs through every step before the next file starts.
+With --staged, the steps run as overlapping stages (extract -> OCR -> parse
+-> clean) connected by bounded queues, each with its own worker count, so
+OCR of one file overlaps with parsing and cleaning of others.
+
+With --watch, the script keeps running and sends new or changed files in the
+watched directories through the staged pipeline as soon as they are fully
+written (see folder_watcher.py).
 
 Usage:
     python run_pdf_to_json_pipeline.py
+    python run_pdf_to_json_pipeline.py --staged --clean --clean-workers 4
+    python run_pdf_to_json_pipeline.py --watch --directory DIR [--directory DIR2]
 """
 
 import os
 import subprocess
 import glob
+import json
 import time
 import sys
+import shutil
+import signal
+import zipfile
+import argparse
+import tempfile
+import contextlib
+import threading
 from datetime import datetime
 
 # Configuration
 PDF_DIRECTORY = "/Users/lipeiyu/Downloads/小学奥数7大板块题库/应用题专题题库/教师解析版"
 OCR_SCRIPT = "/Users/lipeiyu/Downloads/小学奥数7大板块题库/read_pdf_with_ocr.py"
 PARSER_SCRIPT = "/Users/lipeiyu/Downloads/小学奥数7大板块题库/simple_parser.py"
+DOCX_SCRIPT = "/Users/lipeiyu/Downloads/小学奥数7大板块题库/docx_to_text.py"
+# URL of a running ocr_server.py; when set, OCR jobs are sent there instead of loading the models per file
+OCR_SERVER_URL = os.environ.get("OCR_SERVER_URL")
+
+# The local Pix2Text model is shared by all OCR workers of the staged pipeline
+# and is not thread-safe, so local OCR calls are serialized
+OCR_LOCK = threading.Lock()
+# PyMuPDF does not support being called from several threads at once, so
+# extract workers take turns on PDFs (DOCX files are read in parallel)
+FITZ_LOCK = threading.Lock()
 
 
 def log_message(message, error=False):
@@ -33,9 +64,12 @@ def log_message(message, error=False):
 def run_ocr(pdf_path):
     """Run the OCR script on a PDF file"""
     log_message(f"Starting OCR process for: {os.path.basename(pdf_path)}")
+    command = ["python", OCR_SCRIPT, pdf_path]
+    if OCR_SERVER_URL:
+        command += ["--server", OCR_SERVER_URL]
     try:
         result = subprocess.run(
-            ["python", OCR_SCRIPT, pdf_path],
+            command,
             check=True,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
@@ -57,6 +91,36 @@ def run_ocr(pdf_path):
         return None
 
 
+def run_docx_extraction(docx_path):
+    """Run the DOCX extraction script on a DOCX file"""
+    log_message(f"Starting DOCX extraction for: {os.path.basename(docx_path)}")
+    command = ["python", DOCX_SCRIPT, docx_path]
+    if OCR_SERVER_URL:
+        command += ["--server", OCR_SERVER_URL]
+    try:
+        result = subprocess.run(
+            command,
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+        if result.returncode == 0:
+            log_message(f"DOCX extraction completed successfully")
+            # The expected output file path from the DOCX script
+            base_name = os.path.splitext(docx_path)[0]
+            return f"{base_name}_extracted_text_docx.txt"
+        else:
+            log_message(f"DOCX extraction failed with code {result.returncode}: {result.stderr}", error=True)
+            return None
+    except subprocess.CalledProcessError as e:
+        log_message(f"DOCX extraction process error: {str(e)}", error=True)
+        return None
+    except Exception as e:
+        log_message(f"Unexpected error during DOCX extraction: {str(e)}", error=True)
+        return None
+
+
 def run_parser(text_file_path):
     """Run the parser script on a text file"""
     log_message(f"Starting parser for: {os.path.basename(text_file_path)}")
@@ -84,41 +148,305 @@ def run_parser(text_file_path):
         return None
 
 
-def process_file(pdf_path):
-    """Process a single PDF file through the entire pipeline"""
+def process_file(pdf_path, clean=False):
+    """Process a single PDF or DOCX file through the entire pipeline"""
     log_message(f"Processing file: {os.path.basename(pdf_path)}")
     
-    # Step 1: Run OCR to convert PDF to text
-    text_file_path = run_ocr(pdf_path)
+    # Step 1: Convert the document to text (DOCX is read directly, PDF goes through OCR)
+    if pdf_path.lower().endswith(".docx"):
+        text_file_path = run_docx_extraction(pdf_path)
+    else:
+        text_file_path = run_ocr(pdf_path)
+        # Allow a small delay between processes
+        time.sleep(1)
     if not text_file_path or not os.path.exists(text_file_path):
-        log_message(f"OCR did not produce a valid text file for {pdf_path}", error=True)
+        log_message(f"Text extraction did not produce a valid text file for {pdf_path}", error=True)
         return False
     
-    # Allow a small delay between processes
-    time.sleep(1)
-    
     # Step 2: Run parser to convert text to structured JSON
     json_file_path = run_parser(text_file_path)
     if not json_file_path or not os.path.exists(json_file_path):
         log_message(f"Parser did not produce a valid JSON file for {text_file_path}", error=True)
         return False
     
+    # Step 3 (optional): Clean the JSON with AI
+    if clean:
+        try:
+            json_file_path = clean_json_output(json_file_path)
+        except Exception as e:
+            log_message(f"AI cleaning failed for {json_file_path}: {str(e)}", error=True)
+            return False
+    
     log_message(f"Successfully converted {os.path.basename(pdf_path)} to {os.path.basename(json_file_path)}")
     return True
 
 
+def clean_json_output(json_file_path):
+    """Run AI cleaning on a parser output file"""
+    from clean_json_with_ai import clean_json_file
+
+    log_message(f"Starting AI cleaning for: {os.path.basename(json_file_path)}")
+    cleaned_file_path = clean_json_file(json_file_path)
+    log_message(f"AI cleaning completed: {os.path.basename(cleaned_file_path)}")
+    return cleaned_file_path
+
+
+def find_input_files(directories):
+    """Return all DOCX files, plus PDF files that have no DOCX source next to them"""
+    docx_files = []
+    pdf_files = []
+    for directory in directories:
+        docx_files.extend(glob.glob(os.path.join(directory, "*.docx")))
+        pdf_files.extend(glob.glob(os.path.join(directory, "*.pdf")))
+    docx_bases = {os.path.splitext(path)[0] for path in docx_files}
+    pdf_files = [path for path in pdf_files if os.path.splitext(path)[0] not in docx_bases]
+    return docx_files + pdf_files
+
+
+def has_docx_source(pdf_path):
+    """True if a PDF has a DOCX file of the same name next to it (the DOCX is used instead)"""
+    return pdf_path.lower().endswith(".pdf") and os.path.exists(os.path.splitext(pdf_path)[0] + ".docx")
+
+
+def output_is_current(path):
+    """True if the parser JSON for a PDF/DOCX file exists and is newer than the file"""
+    suffix = "_extracted_text_docx.json" if path.lower().endswith(".docx") else "_extracted_text_pdf.json"
+    json_file_path = os.path.splitext(path)[0] + suffix
+    try:
+        return os.path.getmtime(json_file_path) >= os.path.getmtime(path)
+    except OSError:
+        return False
+
+
+def recognize_with_server(image_path):
+    """Send one extracted image to the OCR server, falling back to local OCR if it is unreachable"""
+    from ocr_server import request_image_ocr
+
+    try:
+        with open(image_path, "rb") as image_file:
+            return request_image_ocr(OCR_SERVER_URL, image_file.read(), os.path.basename(image_path))
+    except OSError as e:
+        from read_pdf_with_ocr import extract_text_from_image
+
+        log_message(f"OCR server unavailable ({str(e)}), processing {os.path.basename(image_path)} locally",
+                    error=True)
+        with OCR_LOCK:
+            return extract_text_from_image(image_path)
+
+
+def extract_stage(item):
+    """Staged pipeline: read the document text and extract its images for the OCR stage"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        if item.path.lower().endswith(".docx"):
+            from docx_to_text import DocxTextExtractor
+
+            with zipfile.ZipFile(item.path) as docx:
+                extractor = DocxTextExtractor(docx, defer_ocr=True, temp_dir=temp_dir)
+                item.data["docx_text"] = extractor.extract()
+            item.data["docx_images"] = extractor.deferred_images
+        else:
+            from read_pdf_with_ocr import extract_text_layer, extract_images_from_pdf
+
+            with FITZ_LOCK:
+                item.data["text_blocks"] = extract_text_layer(item.path)
+                item.data["image_paths"] = extract_images_from_pdf(item.path, temp_dir)
+    except Exception:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+    item.data["temp_dir"] = temp_dir
+
+
+def ocr_stage(item):
+    """Staged pipeline: OCR the extracted images and save the combined text"""
+    from read_pdf_with_ocr import extract_text_from_image, ocr_images, save_extracted_text
+
+    # The local model is shared, so without a server one document is OCR'd at a time
+    if OCR_SERVER_URL:
+        recognize, ocr_lock = recognize_with_server, contextlib.nullcontext()
+    else:
+        recognize, ocr_lock = extract_text_from_image, OCR_LOCK
+    try:
+        if "docx_text" in item.data:
+            from docx_to_text import fill_deferred_images, save_docx_text
+
+            output_text = item.data["docx_text"]
+            if item.data["docx_images"]:
+                with ocr_lock:
+                    output_text = fill_deferred_images(output_text, item.data["docx_images"], recognize)
+            item.data["text_file"] = save_docx_text(item.path, output_text)
+        else:
+            with ocr_lock:
+                ocr_blocks = ocr_images(item.data["image_paths"], recognize)
+            output_text = "\n\n".join(item.data["text_blocks"] + ocr_blocks)
+            item.data["text_file"] = save_extracted_text(item.path, output_text)
+    finally:
+        shutil.rmtree(item.data.pop("temp_dir"), ignore_errors=True)
+        for key in ("text_blocks", "image_paths", "docx_text", "docx_images"):
+            item.data.pop(key, None)
+
+
+def parse_stage(item):
+    """Staged pipeline: parse the extracted text into JSON"""
+    from simple_parser import parse_problems
+
+    parse_problems(item.data["text_file"])
+    json_file_path = os.path.splitext(item.data["text_file"])[0] + ".json"
+    if not os.path.exists(json_file_path):
+        raise RuntimeError(f"Parser did not produce a valid JSON file for {item.data['text_file']}")
+    item.data["json_file"] = json_file_path
+
+
+def clean_stage(item):
+    """Staged pipeline: clean the parsed JSON with AI"""
+    item.data["cleaned_file"] = clean_json_output(item.data["json_file"])
+
+
+def build_staged_pipeline(args):
+    """Create the extract -> OCR -> parse (-> clean) pipeline from the command-line settings"""
+    from staged_pipeline import Stage, StagedPipeline
+
+    stages = [
+        Stage("extract", extract_stage, args.extract_workers, args.queue_size),
+        Stage("ocr", ocr_stage, args.ocr_workers, args.queue_size),
+        Stage("parse", parse_stage, args.parse_workers, args.queue_size),
+    ]
+    if args.clean:
+        stages.append(Stage("clean", clean_stage, args.clean_workers, args.queue_size))
+    return StagedPipeline(stages)
+
+
+def report_items(items, counts):
+    """Log each finished pipeline item and count successes and failures"""
+    for item in items:
+        if item.error:
+            counts["failed"] += 1
+            log_message(f"Failed {os.path.basename(item.path)} in {item.failed_stage} stage: {item.error}", error=True)
+        else:
+            counts["successful"] += 1
+            output_file = item.data.get("cleaned_file") or item.data["json_file"]
+            log_message(f"Successfully converted {os.path.basename(item.path)} to {os.path.basename(output_file)}")
+
+
+def report_stage_stats(pipeline, args):
+    """Print per-stage statistics and optionally save them as JSON"""
+    from staged_pipeline import print_stats
+
+    stats = pipeline.stats()
+    print_stats(stats)
+    if args.stats_json:
+        with open(args.stats_json, "w", encoding="utf-8") as f:
+            json.dump(stats, f, indent=2)
+        log_message(f"Stage statistics saved to {args.stats_json}")
+
+
+def run_staged(input_files, args):
+    """Process files with overlapping stages; returns (successful, failed)"""
+    pipeline = build_staged_pipeline(args)
+    counts = {"successful": 0, "failed": 0}
+    report_items(pipeline.run(input_files), counts)
+    report_stage_stats(pipeline, args)
+    return counts["successful"], counts["failed"]
+
+
+def run_watch(args):
+    """Watch the directories and run new or changed files through the staged pipeline until interrupted"""
+    from folder_watcher import Debouncer, create_watcher, is_watched_file
+
+    pipeline = build_staged_pipeline(args)
+    pipeline.start()
+    counts = {"successful": 0, "failed": 0}
+    reporter = threading.Thread(target=report_items, args=(pipeline.completed(), counts),
+                                name="pipeline-reporter", daemon=True)
+    reporter.start()
+
+    # Files added or changed while the watcher was not running are picked up once at startup
+    debouncer = Debouncer(args.settle_seconds)
+    for path in find_input_files(args.directory):
+        if not is_watched_file(path):
+            continue
+        if output_is_current(path):
+            debouncer.mark_reported(path)
+        else:
+            debouncer.touch(path)
+
+    # Stop gracefully on SIGTERM (e.g. from a service manager) as well as Ctrl+C
+    def stop_watching(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, stop_watching)
+
+    watcher = create_watcher(args.directory, use_polling=args.poll, poll_interval=args.poll_interval)
+    log_message(f"Watching {', '.join(args.directory)} for PDF/DOCX files ({watcher.name}), press Ctrl+C to stop")
+    try:
+        while True:
+            changed, removed = watcher.wait(timeout=0.5)
+            for path in removed:
+                debouncer.forget(path)
+            for path in changed:
+                debouncer.touch(path)
+            for path in debouncer.ready():
+                if has_docx_source(path):
+                    log_message(f"Skipping {os.path.basename(path)}: the DOCX version is processed instead")
+                    continue
+                log_message(f"Queued {os.path.basename(path)}")
+                pipeline.submit(path)
+    except KeyboardInterrupt:
+        log_message("Stopping watch mode, finishing queued files")
+    finally:
+        watcher.close()
+        pipeline.finish()
+        reporter.join()
+        report_stage_stats(pipeline, args)
+        log_message(f"Watch mode stopped: {counts['successful']} successful, {counts['failed']} failed")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Convert PDF/DOCX question banks to JSON')
+    parser.add_argument('--directory', action='append', default=None,
+                        help='Directory with the PDF/DOCX files (can be given more than once)')
+    parser.add_argument('--clean', action='store_true', help='Also clean the parsed JSON with AI')
+    parser.add_argument('--staged', action='store_true',
+                        help='Run extract/OCR/parse/clean as overlapping stages with bounded queues')
+    parser.add_argument('--extract-workers', type=int, default=1, help='Staged mode: extraction workers (PDFs are still read one at a time)')
+    parser.add_argument('--ocr-workers', type=int, default=1, help='Staged mode: OCR workers')
+    parser.add_argument('--parse-workers', type=int, default=1, help='Staged mode: parser workers')
+    parser.add_argument('--clean-workers', type=int, default=4, help='Staged mode: AI cleaning workers')
+    parser.add_argument('--queue-size', type=int, default=4,
+                        help='Staged mode: maximum number of files waiting in front of each stage')
+    parser.add_argument('--stats-json', default=None, help='Staged mode: write per-stage statistics to this file')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and process new or changed files as they appear (uses the staged pipeline)')
+    parser.add_argument('--settle-seconds', type=float, default=2.0,
+                        help='Watch mode: how long a file must stay unchanged before it is processed')
+    parser.add_argument('--poll', action='store_true', help='Watch mode: poll the directories instead of using inotify')
+    parser.add_argument('--poll-interval', type=float, default=2.0, help='Watch mode: seconds between directory polls')
+    args = parser.parse_args()
+    args.directory = args.directory or [PDF_DIRECTORY]
+    return args
+
+
 def main():
-    """Main function to process all PDF files in the directory"""
+    """Main function to process all PDF and DOCX files in the directory"""
+    args = parse_arguments()
     log_message("Starting PDF to JSON conversion pipeline")
     
-    # Get all PDF files in the directory
-    pdf_files = glob.glob(os.path.join(PDF_DIRECTORY, "*.pdf"))
+    if args.watch:
+        run_watch(args)
+        return
+    
+    # Get all DOCX files, plus PDF files that have no DOCX source next to them
+    pdf_files = find_input_files(args.directory)
     
     if not pdf_files:
-        log_message("No PDF files found in the specified directory", error=True)
+        log_message("No PDF or DOCX files found in the specified directory", error=True)
         return
     
-    log_message(f"Found {len(pdf_files)} PDF files to process")
+    log_message(f"Found {len(pdf_files)} files to process")
+    
+    if args.staged:
+        successful, failed = run_staged(pdf_files, args)
+        log_message(f"Conversion complete: {successful} successful, {failed} failed")
+        return
     
     # Track statistics
     successful = 0
@@ -126,7 +454,7 @@ def main():
     
     # Process each PDF file
     for pdf_path in pdf_files:
-        if process_file(pdf_path):
+        if process_file(pdf_path, clean=args.clean):
             successful += 1
         else:
             failed += 1
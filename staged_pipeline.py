@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Staged Pipeline
+
+A small producer/consumer runner used by run_pdf_to_json_pipeline.py. Items
+flow through a list of stages connected by bounded queues; every stage has
+its own number of worker threads, so a CPU-bound stage (OCR) and a
+network-bound stage (AI cleaning) work on different files at the same time.
+
+- Memory is capped by the queue sizes: a stage blocks when its output queue is full
+- An item whose stage function raises is marked failed and skips later stages
+- Queue depth and worker utilization are sampled per stage and reported at the end
+"""
+
+import time
+import queue
+import threading
+from datetime import datetime
+
+# Marker passed down the queues to tell workers that no more items will come
+_DONE = object()
+
+
+def log_message(message, error=False):
+    """Print a timestamped log message"""
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    prefix = "[ERROR]" if error else "[INFO]"
+    print(f"{prefix} {timestamp} - {message}", flush=True)
+
+
+class PipelineItem:
+    """A document moving through the pipeline"""
+
+    def __init__(self, path):
+        self.path = path
+        self.data = {}
+        self.error = None
+        self.failed_stage = None
+
+
+class Stage:
+    """One pipeline step with its own worker threads and input queue"""
+
+    def __init__(self, name, func, workers=1, queue_size=4):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.input = queue.Queue(maxsize=max(1, queue_size))
+        self.output = None
+        self.output_workers = 1
+        self.threads = []
+        self.lock = threading.Lock()
+        self.finished_workers = 0
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        # Running totals rather than a sample list, so long-lived (watch mode) runs use constant memory
+        self.depth_total = 0
+        self.depth_count = 0
+        self.max_depth = 0
+
+    def start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(target=self.work, name=f"{self.name}-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def work(self):
+        while True:
+            item = self.input.get()
+            if item is _DONE:
+                with self.lock:
+                    self.finished_workers += 1
+                    last_worker = self.finished_workers == self.workers
+                # The last worker to finish tells every worker of the next stage
+                # that the stream has ended
+                if last_worker and self.output is not None:
+                    for _ in range(self.output_workers):
+                        self.output.put(_DONE)
+                return
+
+            if item.error is None:
+                start = time.perf_counter()
+                try:
+                    self.func(item)
+                except Exception as e:
+                    item.error = str(e)
+                    item.failed_stage = self.name
+                    log_message(f"{self.name} failed for {item.path}: {item.error}", error=True)
+                elapsed = time.perf_counter() - start
+                with self.lock:
+                    self.busy_seconds += elapsed
+                    self.processed += 1
+                    if item.error is not None:
+                        self.failed += 1
+
+            if self.output is not None:
+                self.output.put(item)
+
+    def sample(self):
+        depth = self.input.qsize()
+        self.depth_total += depth
+        self.depth_count += 1
+        self.max_depth = max(self.max_depth, depth)
+
+    def stats(self, wall_seconds):
+        average_depth = self.depth_total / self.depth_count if self.depth_count else 0.0
+        utilization = self.busy_seconds / (self.workers * wall_seconds) if wall_seconds > 0 else 0.0
+        return {
+            "stage": self.name,
+            "workers": self.workers,
+            "queue_size": self.input.maxsize,
+            "processed": self.processed,
+            "failed": self.failed,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "utilization": round(utilization, 3),
+            "avg_queue_depth": round(average_depth, 2),
+            "max_queue_depth": self.max_depth,
+        }
+
+
+class StagedPipeline:
+    """Connect stages with bounded queues and run items through them"""
+
+    def __init__(self, stages, sample_interval=0.5, report_interval=30.0):
+        self.stages = stages
+        self.sample_interval = sample_interval
+        self.report_interval = report_interval
+        self.results = queue.Queue()
+        for current, following in zip(stages, stages[1:]):
+            current.output = following.input
+            current.output_workers = following.workers
+        stages[-1].output = self.results
+        self.started_at = None
+        self.stop_sampling = threading.Event()
+
+    def start(self):
+        """Start every stage's workers and the queue-depth sampler"""
+        self.started_at = time.perf_counter()
+        for stage in self.stages:
+            stage.start()
+        threading.Thread(target=self.sample_loop, name="pipeline-sampler", daemon=True).start()
+
+    def submit(self, path):
+        """Add a document to the first stage, blocking while its queue is full"""
+        item = PipelineItem(path)
+        self.stages[0].input.put(item)
+        return item
+
+    def finish(self):
+        """Signal the end of input; the marker flows through every stage"""
+        for _ in range(self.stages[0].workers):
+            self.stages[0].input.put(_DONE)
+
+    def completed(self):
+        """Yield items as they leave the last stage, until the end-of-input marker arrives"""
+        while True:
+            item = self.results.get()
+            if item is _DONE:
+                self.stop_sampling.set()
+                return
+            yield item
+
+    def sample_loop(self):
+        last_report = time.perf_counter()
+        while not self.stop_sampling.wait(self.sample_interval):
+            for stage in self.stages:
+                stage.sample()
+            if self.report_interval and time.perf_counter() - last_report >= self.report_interval:
+                last_report = time.perf_counter()
+                depths = ", ".join(f"{stage.name}={stage.input.qsize()}" for stage in self.stages)
+                log_message(f"Queue depths: {depths}")
+
+    def stats(self):
+        """Per-stage queue depth and utilization since start()"""
+        wall_seconds = time.perf_counter() - self.started_at if self.started_at else 0.0
+        return {
+            "wall_seconds": round(wall_seconds, 3),
+            "stages": [stage.stats(wall_seconds) for stage in self.stages],
+        }
+
+    def run(self, paths):
+        """Run every path through the pipeline and return the finished items"""
+        self.start()
+        feeder = threading.Thread(target=self.feed, args=(paths,), name="pipeline-feeder", daemon=True)
+        feeder.start()
+        items = list(self.completed())
+        feeder.join()
+        return items
+
+    def feed(self, paths):
+        for path in paths:
+            self.submit(path)
+        self.finish()
+
+
+def print_stats(stats):
+    """Print a per-stage report of a StagedPipeline run"""
+    log_message(f"Pipeline wall time: {stats['wall_seconds']:.1f}s")
+    for stage in stats["stages"]:
+        log_message(f"  {stage['stage']:<8} workers={stage['workers']} processed={stage['processed']} "
+                    f"failed={stage['failed']} busy={stage['busy_seconds']:.1f}s "
+                    f"utilization={stage['utilization'] * 100:.0f}% "
+                    f"queue avg={stage['avg_queue_depth']:.1f} max={stage['max_queue_depth']}/{stage['queue_size']}")